@@ -0,0 +1,73 @@
+import argparse
+
+from binomial_pricing_model import TREE_MODES, binomial_american_option, binomial_tree_graph
+
+
+''' Command line entry point for the binomial pricer.
+
+    Run from this directory:
+        python -m binomial_cli price --S 100 --K 100 --T 1 --r 0.05 --sigma 0.2 --type put --greeks
+        python -m binomial_cli graph --S 100 --K 100 --T 0.25 --r 0.05 --sigma 0.2 --N 50 --output tree.png
+'''
+
+
+def _dividend(text):
+    """Parse a "time:amount" pair for --dividend."""
+    try:
+        time, amount = (float(x) for x in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected time:amount, got {text!r}")
+    return time, amount
+
+
+def _add_contract_arguments(parser, N):
+    parser.add_argument("--S", type=float, required=True, help="Current stock price")
+    parser.add_argument("--K", type=float, required=True, help="Strike price")
+    parser.add_argument("--T", type=float, required=True, help="Time to expiration (years)")
+    parser.add_argument("--r", type=float, required=True, help="Risk-free interest rate")
+    parser.add_argument("--sigma", type=float, required=True, help="Volatility")
+    parser.add_argument("--N", type=int, default=N, help=f"Number of time steps (default {N})")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="binomial_cli", description="Binomial American option pricer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    price = commands.add_parser("price", help="Price an American option")
+    _add_contract_arguments(price, N=200)
+    price.add_argument("--type", dest="option_type", choices=("call", "put"), default="call")
+    price.add_argument("--mode", choices=TREE_MODES, default="crr")
+    price.add_argument("--q", type=float, default=0.0, help="Continuous dividend yield")
+    price.add_argument("--dividend", type=_dividend, action="append", default=[], metavar="TIME:AMOUNT",
+                       help="Discrete cash dividend; repeat for several")
+    price.add_argument("--greeks", action="store_true", help="Also print delta, gamma, theta, vega and rho")
+
+    graph = commands.add_parser("graph", help="Draw the binomial stock price tree")
+    _add_contract_arguments(graph, N=4)
+    graph.add_argument("--max-nodes", type=int, default=5000, help="Node budget before layers are thinned")
+    graph.add_argument("--exercise", dest="option_type", choices=("call", "put"),
+                       help="Colour the early exercise region of this option type")
+    graph.add_argument("--output", help="Save the figure to this file")
+    graph.add_argument("--no-show", dest="show", action="store_false", help="Do not open the plot window")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "price":
+        result = binomial_american_option(args.S, args.K, args.T, args.r, args.sigma, args.N, args.option_type,
+                                          args.mode, greeks=args.greeks, q=args.q, dividends=args.dividend or None)
+        if args.greeks:
+            for name, value in result.items():
+                print(f"{name}: {value}")
+        else:
+            print(f"American {args.option_type.capitalize()} Option Price: {result}")
+
+    elif args.command == "graph":
+        binomial_tree_graph(args.S, args.K, args.T, args.r, args.sigma, args.N, args.max_nodes, args.option_type,
+                            args.output, args.show)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import numpy as np
+from dataclasses import dataclass
+from scipy.optimize import brentq
+
+from binomial_pricing_model import binomial_american_chain, binomial_american_option, _option_sign
+
+
+''' Implied volatility for whole American option chains, inverted through the binomial pricer.
+
+    1. Quotes outside the no-arbitrage range of the tree (below the price at the lowest vol or
+       above the price at the highest vol) are flagged instead of being forced to a number, and so
+       are quotes within tol of either edge price, where every vol nearby prices within tol.
+    2. Every strike in an expiry is warm-started from its neighbours: a sparse set of anchor
+       strikes is solved first, and the rest start from the anchors' vols interpolated in strike.
+    3. All contracts iterate together with safeguarded Newton steps; price and lattice vega for
+       the whole batch come from one binomial_american_chain call per iteration, with the vol
+       bumps riding along as extra contracts. Steps that leave the current bracket bisect instead.
+    4. Whatever Newton leaves unconverged goes to Brent's method on its final bracket.
+'''
+
+
+@dataclass
+class ImpliedVolResult:
+    vols: np.ndarray
+    converged: np.ndarray
+    iterations: np.ndarray
+    method: np.ndarray
+
+    @property
+    def failed(self):
+        """Flat indices of the contracts whose vol could not be found."""
+        return np.flatnonzero(~self.converged)
+
+
+def _newton(prices, S, K, T, r, phi, sigma, lower, upper, N, mode, tol, max_iter, vol_bump, q, dividends):
+    """Vectorized safeguarded Newton; returns (sigma, lower, upper, converged, iterations)."""
+    sigma, lower, upper = sigma.copy(), lower.copy(), upper.copy()
+    converged = np.zeros(sigma.size, dtype=bool)
+    iterations = np.zeros(sigma.size, dtype=int)
+    option_type = np.where(phi > 0, "call", "put")
+
+    for _ in range(max_iter):
+        active = np.flatnonzero(~converged)
+        if active.size == 0:
+            break
+        iterations[active] += 1
+
+        # Price, sigma + bump and sigma - bump for every active contract in one chain call
+        vol = sigma[active]
+        stacked = binomial_american_chain(np.tile(S[active], 3), np.tile(K[active], 3), np.tile(T[active], 3), r,
+                                          np.concatenate([vol, vol + vol_bump, np.maximum(vol - vol_bump, 1e-6)]),
+                                          N, np.tile(option_type[active], 3), mode, q=q, dividends=dividends)
+        n = active.size
+        price, vega = stacked[:n], (stacked[n:2 * n] - stacked[2 * n:]) / (2 * vol_bump)
+
+        error = price - prices[active]
+        converged[active] = np.abs(error) <= tol
+        upper[active] = np.where(error > 0, vol, upper[active])
+        lower[active] = np.where(error < 0, vol, lower[active])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = vol - error / vega
+        bisect = ~((step > lower[active]) & (step < upper[active]) & (vega > 0))
+        sigma[active] = np.where(converged[active], vol, np.where(bisect, 0.5 * (lower[active] + upper[active]), step))
+
+    return sigma, lower, upper, converged, iterations
+
+
+def binomial_implied_vol(prices, S, K, T, r, option_type="call", N=200, mode="crr", tol=1e-6, max_iter=30,
+                         vol_bounds=(0.001, 5.0), initial_vol=None, anchor_stride=4, vol_bump=0.01, q=0.0,
+                         dividends=None):
+    """
+    Invert American option prices to implied vols over a whole chain at once.
+
+    Args:
+        prices: Market option prices (e.g. bid/ask mids).
+        S: Current stock price(s).
+        K: Strike price(s).
+        T: Time(s) to expiration (years).
+        r: Risk-free interest rate.
+        option_type: "call"/"put", or an array of them.
+        N: Binomial steps used by the pricer.
+        mode: Tree mode, see binomial_pricing_model.TREE_MODES.
+        tol: Absolute price tolerance; quotes within tol of the price at either vol bound
+            are reported as not converged.
+        max_iter: Newton iterations before falling back to Brent.
+        vol_bounds: (lowest, highest) vol searched.
+        initial_vol: Optional starting vols (e.g. the previous refresh); skips the anchor pass.
+        anchor_stride: Every anchor_stride-th strike of each expiry is solved first.
+        vol_bump: Vol bump of the lattice vega.
+        q: Continuous dividend yield or borrow cost.
+        dividends: Discrete cash dividends as (time, amount) pairs.
+    Returns:
+        ImpliedVolResult with vols (NaN where not converged), converged mask, Newton
+        iterations and method ("newton", "brent" or "none") per contract, all shaped
+        like the broadcast inputs.
+    """
+    prices, S, K, T, phi = np.broadcast_arrays(prices, S, K, T, _option_sign(option_type))
+    shape = prices.shape
+    prices, S, K, T, phi = (np.ravel(x).astype(float) for x in (prices, S, K, T, phi))
+    n = prices.size
+    option_type = np.where(phi > 0, "call", "put")
+
+    # Quotes the tree cannot reach at any vol inside the bounds. Below sigma = |r - q| * sqrt(dt)
+    # the CRR up-probability leaves [0, 1], so the lower bound is kept clear of it.
+    low_vol, high_vol = vol_bounds
+    lower = np.maximum(low_vol, 2 * abs(r - q) * np.sqrt(T / N))
+    upper = np.full(n, high_vol)
+    edge_prices = binomial_american_chain(np.tile(S, 2), np.tile(K, 2), np.tile(T, 2), r,
+                                          np.concatenate([lower, upper]), N, np.tile(option_type, 2), mode,
+                                          q=q, dividends=dividends)
+    # A quote within tol of an edge price would "converge" at whatever vol Newton tries first
+    # (e.g. far out-of-the-money quotes near zero), so it is flagged instead
+    reachable = (prices > edge_prices[:n] + tol) & (prices < edge_prices[n:] - tol)
+
+    converged = np.zeros(n, dtype=bool)
+    iterations = np.zeros(n, dtype=int)
+
+    if initial_vol is not None:
+        sigma = np.clip(np.broadcast_to(initial_vol, shape).ravel().astype(float), lower, upper)
+    else:
+        # Brenner-Subrahmanyam guess for the anchors, then neighbours start from the anchors' smile
+        sigma = np.clip(np.sqrt(2 * np.pi / T) * prices / S, lower, upper)
+        anchors = np.zeros(n, dtype=bool)
+        for expiry in np.unique(T):
+            rows = np.flatnonzero((T == expiry) & reachable)
+            rows = rows[np.argsort(K[rows])]
+            anchors[rows[::anchor_stride]] = True
+            anchors[rows[-1:]] = True
+
+        idx = np.flatnonzero(anchors)
+        sigma[idx], lower[idx], upper[idx], converged[idx], iterations[idx] = _newton(
+            prices[idx], S[idx], K[idx], T[idx], r, phi[idx], sigma[idx], lower[idx], upper[idx],
+            N, mode, tol, max_iter, vol_bump, q, dividends)
+
+        for expiry in np.unique(T):
+            solved = np.flatnonzero((T == expiry) & anchors & converged)
+            rest = np.flatnonzero((T == expiry) & ~anchors)
+            if solved.size and rest.size:
+                order = np.argsort(K[solved])
+                sigma[rest] = np.interp(K[rest], K[solved][order], sigma[solved][order])
+
+    # Everything reachable and not yet solved iterates together
+    idx = np.flatnonzero(reachable & ~converged)
+    sigma[idx], lower[idx], upper[idx], converged[idx], iters = _newton(
+        prices[idx], S[idx], K[idx], T[idx], r, phi[idx], sigma[idx], lower[idx], upper[idx],
+        N, mode, tol, max_iter, vol_bump, q, dividends)
+    iterations[idx] += iters
+
+    method = np.where(converged, "newton", "none").astype(object)
+    for i in np.flatnonzero(reachable & ~converged):
+        objective = lambda vol: binomial_american_option(S[i], K[i], T[i], r, vol, N, option_type[i], mode,
+                                                         q=q, dividends=dividends) - prices[i]
+        try:
+            sigma[i] = brentq(objective, lower[i], upper[i], xtol=1e-10)
+        except ValueError:
+            continue
+        converged[i] = abs(objective(sigma[i])) <= tol
+        method[i] = "brent" if converged[i] else "none"
+
+    sigma[~converged] = np.nan
+    return ImpliedVolResult(sigma.reshape(shape), converged.reshape(shape), iterations.reshape(shape),
+                            method.reshape(shape))
+
+
+def implied_vol_from_option_chain(chain, S, T, r, option_type, **kwargs):
+    """
+    Add binomial implied vols to an option chain DataFrame (e.g. from OptionData.get_option_data).
+
+    Uses the bid/ask mid where both sides are quoted and lastPrice otherwise.
+
+    Args:
+        chain: DataFrame with "strike", "bid", "ask" and "lastPrice" columns, one expiry.
+        S: Current stock price.
+        T: Time to expiration (years).
+        r: Risk-free interest rate.
+        option_type: "call" or "put".
+        **kwargs: Passed to binomial_implied_vol.
+    Returns:
+        Copy of chain with "binomialIV" and "binomialIVConverged" columns.
+    """
+    bid, ask = chain["bid"].to_numpy(float), chain["ask"].to_numpy(float)
+    prices = np.where((bid > 0) & (ask > 0), 0.5 * (bid + ask), chain["lastPrice"].to_numpy(float))
+    result = binomial_implied_vol(prices, S, chain["strike"].to_numpy(float), T, r, option_type, **kwargs)
+
+    chain = chain.copy()
+    chain["binomialIV"] = result.vols
+    chain["binomialIVConverged"] = result.converged
+    return chain
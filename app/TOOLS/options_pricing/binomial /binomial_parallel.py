@@ -0,0 +1,99 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from binomial_pricing_model import binomial_american_chain, _option_sign
+
+
+''' Process-pool driver for binomial_american_chain, for chains too large for one vectorized pass.
+
+    Contracts are sorted by expiry and cut into chunks of at most chunk_size at expiry boundaries,
+    so a chunk only splits an expiry that alone holds more than chunk_size contracts (each piece of
+    an expiry costs its own lattice pass). The sorted arrays are written once into a shared-memory
+    block. Workers receive only the block names and their [start, stop) slice, read
+    spot/strike/expiry/vol/type straight from shared memory and write prices back into a shared
+    output block, so nothing but a few integers is pickled per chunk.
+'''
+
+_FIELDS = ("S", "K", "T", "sigma", "phi")
+
+
+def _price_chunk(input_name, output_name, n, start, stop, r, N, mode, q, dividends):
+    """Worker: price contracts [start, stop) of the shared input block into the shared output block."""
+    inputs = shared_memory.SharedMemory(name=input_name)
+    outputs = shared_memory.SharedMemory(name=output_name)
+    try:
+        data = np.ndarray((len(_FIELDS), n), dtype=np.float64, buffer=inputs.buf)
+        prices = np.ndarray((n,), dtype=np.float64, buffer=outputs.buf)
+        S, K, T, sigma, phi = data[:, start:stop]
+        prices[start:stop] = binomial_american_chain(S, K, T, r, sigma, N, np.where(phi > 0, "call", "put"), mode,
+                                                     q=q, dividends=dividends)
+        del data, prices, S, K, T, sigma, phi
+    finally:
+        inputs.close()
+        outputs.close()
+    return stop - start
+
+
+def _chunk_bounds(T, chunk_size):
+    """[start, stop) chunks of the sorted expiries T, at most chunk_size long, cut between expiries where possible."""
+    bounds, start, n = [], 0, T.size
+    while start < n:
+        stop = min(start + chunk_size, n)
+        if stop < n:
+            # Back up to the first contract of the expiry the cut would fall in, unless that is the whole chunk
+            expiry_start = int(np.searchsorted(T, T[stop], side="left"))
+            if expiry_start > start:
+                stop = expiry_start
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def price_chain_parallel(S, K, T, r, sigma, N, option_type="call", mode="crr", workers=None, chunk_size=256,
+                         executor=None, q=0.0, dividends=None):
+    """
+    Price a large American option chain across a process pool.
+
+    Args:
+        S, K, T, r, sigma, N, option_type, mode: As for binomial_american_chain.
+        workers: Worker processes; defaults to os.cpu_count(). Ignored if executor is given.
+        chunk_size: Most contracts per task. Larger chunks vectorize better, smaller ones balance better.
+        executor: Optional ProcessPoolExecutor to reuse across calls, avoiding pool start-up.
+        q, dividends: Dividend yield and discrete cash dividends, as for binomial_american_chain.
+    Returns:
+        Array of option prices with the broadcast shape of the inputs.
+    """
+    S, K, T, sigma, phi = np.broadcast_arrays(S, K, T, sigma, _option_sign(option_type))
+    shape = K.shape
+    n = K.size
+    order = np.argsort(np.ravel(T), kind="stable")
+
+    inputs = shared_memory.SharedMemory(create=True, size=max(len(_FIELDS) * n * 8, 1))
+    outputs = shared_memory.SharedMemory(create=True, size=max(n * 8, 1))
+    try:
+        data = np.ndarray((len(_FIELDS), n), dtype=np.float64, buffer=inputs.buf)
+        for row, values in enumerate((S, K, T, sigma, phi)):
+            data[row] = np.ravel(values)[order]
+
+        pool = executor or ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+        try:
+            futures = [pool.submit(_price_chunk, inputs.name, outputs.name, n, start, stop, r, N, mode, q, dividends)
+                       for start, stop in _chunk_bounds(data[_FIELDS.index("T")], chunk_size)]
+            for future in futures:
+                future.result()
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+        prices = np.empty(n)
+        prices[order] = np.ndarray((n,), dtype=np.float64, buffer=outputs.buf)
+        del data
+    finally:
+        inputs.close()
+        inputs.unlink()
+        outputs.close()
+        outputs.unlink()
+
+    return prices.reshape(shape)
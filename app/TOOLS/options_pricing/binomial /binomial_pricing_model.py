@@ -1,6 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import time
+from collections import OrderedDict
+from scipy.special import ndtr
 
 
 
@@ -15,83 +16,541 @@ import time
      sigma: Volatility.
      N: Number of time steps.
      option_type: "call" or "put".
+     mode: Tree construction, one of TREE_MODES:
+         "crr"  - Cox-Ross-Rubinstein (oscillates as N grows).
+         "bbs"  - CRR with Black-Scholes smoothing of the last step (Broadie-Detemple).
+         "bbsr" - BBS with two-point Richardson extrapolation, 2 * BBS(N) - BBS(N / 2).
+         "lr"   - Leisen-Reimer with Peizer-Pratt inversion (N is rounded up to odd).
+     greeks: If True, return a dict of price, delta, gamma, theta, vega and rho instead.
+         The Greeks are read off the first three layers, so N must be at least
+         GREEK_MIN_STEPS[mode].
+     q: Continuous dividend yield or borrow cost.
+     dividends: Discrete cash dividends as (time in years, amount) pairs. They are handled
+         with the escrowed model: the lattice is built on S less the present value of the
+         dividends before expiry, and that present value is added back at every node when
+         checking exercise, so the tree still recombines.
  Returns:
-     Option price.
+     Option price, or the dict of Greeks (theta per year, vega and rho per unit change).
  """
 
+TREE_MODES = ("crr", "bbs", "bbsr", "lr")
+# Smallest N with layers 0-2 before expiry: "lr" rounds N up to odd, "bbsr" also needs them at N / 2
+GREEK_MIN_STEPS = {"crr": 3, "bbs": 3, "bbsr": 5, "lr": 2}
 
 
-def binomial_american_option(S, K, T, r, sigma, N, option_type="call"):
 
-    dt = T / N
-    u = np.exp(sigma * np.sqrt(dt))
-    d = 1 / u
-    p = (np.exp(r * dt) - d) / (u - d)
-
-    # Initialize stock price tree
-    stock_prices = np.zeros((N + 1, N + 1))
-    stock_prices[0, 0] = S
-    for i in range(1, N + 1):
-        stock_prices[i, 0] = stock_prices[i - 1, 0] * d
-        for j in range(1, i + 1):
-            stock_prices[i, j] = stock_prices[i - 1, j - 1] * u
-
-    # Initialize option value tree
-    option_values = np.zeros((N + 1, N + 1))
-
-    # Calculate option values at expiration
-    for j in range(N + 1):
-        if option_type == "call":
-            option_values[N, j] = max(0, stock_prices[N, j] - K)
-        elif option_type == "put":
-            option_values[N, j] = max(0, K - stock_prices[N, j])
-
-    # Backward induction
+def _option_sign(option_type):
+    """Map "call"/"put" (scalar or array) to +1.0/-1.0 so payoffs are max(phi * (S - K), 0)."""
+    option_type = np.asarray(option_type)
+    is_call = option_type == "call"
+    if not np.all(is_call | (option_type == "put")):
+        raise ValueError(f"option_type must be 'call' or 'put', got {option_type!r}")
+    return np.where(is_call, 1.0, -1.0)
+
+
+def _black_scholes(S, K, T, r, sigma, phi, q=0.0):
+    """European Black-Scholes price with dividend yield q; phi is +1 for calls and -1 for puts."""
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    return phi * (S * np.exp(-q * T) * ndtr(phi * d1) - K * np.exp(-r * T) * ndtr(phi * d2))
+
+
+def _dividend_pv(dividends, times, T, r):
+    """
+    Value at each of times of the cash dividends still to be paid after it and before expiry T.
+
+    Returns an array of shape (len(times), contracts), contracts being the size of r.
+    """
+    paid_at, amount = np.asarray(dividends, dtype=float).reshape(-1, 2).T
+    times = times[:, None, None]
+    ahead = (paid_at[:, None] > times) & (paid_at[:, None] < T)
+    pv = amount[:, None] * np.exp(-np.atleast_1d(r) * (paid_at[:, None] - times))
+    return np.sum(np.where(ahead, pv, 0.0), axis=1)
+
+
+def _peizer_pratt(z, n):
+    """Peizer-Pratt method 2 inversion used by the Leisen-Reimer tree (n odd)."""
+    return 0.5 + np.sign(z) * np.sqrt(
+        0.25 - 0.25 * np.exp(-(z / (n + 1 / 3 + 0.1 / (n + 1))) ** 2 * (n + 1 / 6)))
+
+
+def _lattice_rollback(S, K, phi, u, d, p, disc, N, smooth=None, observer=None, offsets=None):
+    """
+    Backward induction over a batch of binomial lattices that all have N steps.
+
+    Every argument except N, smooth, observer and offsets is an array of shape
+    (contracts,), or (1,) when it is shared by all contracts, so contracts on
+    the same lattice share one column of stock prices. Layers are laid out
+    nodes x contracts so each step works on contiguous blocks, and only the
+    current layer is kept in memory.
+
+    smooth, if given, maps the stock prices one step before expiration to the
+    European value over that last step, replacing the discrete continuation
+    value there (Broadie-Detemple smoothing).
+
+    offsets, if given, has one row per layer that is added to the lattice
+    prices before checking exercise (the escrowed cash dividends still to
+    come); the last row must be zero.
+
+    observer, if given, is called as observer(i, stock_prices, exercise_value,
+    continuation_value) after layer i is computed, from N - 1 down to 0, with
+    offsets already added to the stock prices.
+
+    Returns:
+        Option values at the root, shape (contracts,).
+    """
+    # Stock prices at expiration: node j has j up-moves, S * u**j * d**(N - j)
+    j = np.arange(N + 1)[:, None]
+    stock_prices = S * u ** j * d ** (N - j)
+    option_values = np.maximum(phi * (stock_prices - K), 0.0)
+
+    # Node j of layer i sits one down-move before node j + 1 of layer i + 1.
+    p_up = disc * p
+    p_down = disc * (1 - p)
     for i in range(N - 1, -1, -1):
-        for j in range(i + 1):
-            continuation_value = np.exp(-r * dt) * (
-                    p * option_values[i + 1, j + 1] + (1 - p) * option_values[i + 1, j]
-            )
-            if option_type == "call":
-                intrinsic_value = max(0, stock_prices[i, j] - K)
-            elif option_type == "put":
-                intrinsic_value = max(0, K - stock_prices[i, j])
-            option_values[i, j] = max(intrinsic_value, continuation_value)
-
-    return option_values[0, 0]
-
-# Example usage
-S = 100  # Current stock price
-K = 100  # Strike price
-T = 1    # Time to expiration (years)
-r = 0.05 # Risk-free interest rate
-sigma = 0.2 # Volatility
-N = 200   # Number of time steps
-
-call_price = binomial_american_option(S, K, T, r, sigma, N, "call")
-put_price = binomial_american_option(S, K, T, r, sigma, N, "put")
-
-print(f"American Call Option Price: {call_price}")
-print(f"American Put Option Price: {put_price}")
-time.sleep(1)
-print("\n.. starting the plotting.. \n This code generates a graphical representation of a binomial tree model for stock prices. It calculates the possible stock prices at each time step (N steps) based on the given parameters (S initial stock price, K strike price, T time to expiration, r risk-free interest rate, and sigma volatility) and plots the resulting tree structure using matplotlib.")
+        stock_prices = stock_prices[1:] / u
+        if smooth is not None and i == N - 1:
+            continuation_value = smooth(stock_prices)
+        else:
+            continuation_value = p_up * option_values[1:] + p_down * option_values[:-1]
+        spot = stock_prices if offsets is None else stock_prices + offsets[i]
+        exercise_value = phi * (spot - K)
+        option_values = np.maximum(exercise_value, continuation_value)
+        if observer is not None:
+            observer(i, spot, exercise_value, continuation_value)
+
+    return option_values[0]
+
+
+def _price_batch(S, K, phi, T, r, sigma, N, mode, greeks=False, observer=None, q=0.0, dividends=None):
+    """
+    Root values for a batch of contracts sharing an expiry T; arrays as in _lattice_rollback.
+
+    With greeks=True, returns a dict of price, delta, gamma and theta, the
+    Greeks read off the first two layers of the same lattice. observer is
+    passed through to _lattice_rollback (not supported for "bbsr").
+    """
+    if greeks and N < GREEK_MIN_STEPS.get(mode, 0):
+        raise ValueError(f"greeks with mode {mode!r} need N >= {GREEK_MIN_STEPS[mode]}, got {N}")
+    if mode == "bbsr":
+        N += N % 2
+        fine = _price_batch(S, K, phi, T, r, sigma, N, "bbs", greeks, q=q, dividends=dividends)
+        coarse = _price_batch(S, K, phi, T, r, sigma, N // 2, "bbs", greeks, q=q, dividends=dividends)
+        if greeks:
+            return {name: 2 * fine[name] - coarse[name] for name in fine}
+        return 2 * fine - coarse
+
+    if mode == "lr":
+        N += 1 - N % 2
+    dt = T / N
+    growth = np.exp((r - q) * dt)
+
+    # Escrowed dividends: the lattice carries S less the dividends to come
+    offsets = None
+    if dividends is not None and len(dividends):
+        offsets = _dividend_pv(dividends, np.arange(N + 1) * dt, T, r)
+        S = S - offsets[0]
+
+    if mode in ("crr", "bbs"):
+        u = np.exp(sigma * np.sqrt(dt))
+        d = 1 / u
+        p = (growth - d) / (u - d)
+    elif mode == "lr":
+        sigma_sqrt_T = sigma * np.sqrt(T)
+        d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / sigma_sqrt_T
+        p = _peizer_pratt(d1 - sigma_sqrt_T, N)
+        u = growth * _peizer_pratt(d1, N) / p
+        d = (growth - p * u) / (1 - p)
+    else:
+        raise ValueError(f"mode must be one of {TREE_MODES}, got {mode!r}")
+
+    smooth = None
+    if mode == "bbs":
+        smooth = lambda stock_prices: _black_scholes(stock_prices, K, dt, r, sigma, phi, q)
+
+    disc = np.exp(-r * dt)
+    if not greeks:
+        return _lattice_rollback(S, K, phi, u, d, p, disc, N, smooth, observer, offsets)
+
+    layers = {}
+
+    def record(i, stock_prices, exercise_value, continuation_value):
+        if i <= 2:
+            layers[i] = (stock_prices, np.maximum(exercise_value, continuation_value))
+
+    _lattice_rollback(S, K, phi, u, d, p, disc, N, smooth, record, offsets)
+    (stock_0, value_0), (stock_1, value_1), (stock_2, value_2) = layers[0], layers[1], layers[2]
+    delta_up = (value_2[2] - value_2[1]) / (stock_2[2] - stock_2[1])
+    delta_down = (value_2[1] - value_2[0]) / (stock_2[1] - stock_2[0])
+    gamma = (delta_up - delta_down) / (0.5 * (stock_2[2] - stock_2[0]))
+
+    # The middle node two steps out is only back at spot when u * d == 1 (not
+    # for Leisen-Reimer), so take out the move along S before differencing in time.
+    drift = stock_2[1] - stock_0[0]
+    value_at_spot = value_2[1] - 0.5 * (delta_up + delta_down) * drift - 0.5 * gamma * drift ** 2
+    return {
+        "price": value_0[0],
+        "delta": (value_1[1] - value_1[0]) / (stock_1[1] - stock_1[0]),
+        "gamma": gamma,
+        "theta": (value_at_spot - value_0[0]) / (2 * dt),
+    }
+
+
+def _greeks_batch(S, K, phi, T, r, sigma, N, mode, q=0.0, dividends=None, vol_bump=0.01, rate_bump=0.001):
+    """
+    Price and all Greeks for a batch sharing an expiry T.
+
+    Delta, gamma and theta come off the base lattice. Vega and rho are
+    one-sided differences, each from one more rollback of the batch at
+    sigma + vol_bump or r + rate_bump; contracts sharing spot and vol still
+    share one stock-price column in every rollback, so the whole set costs
+    about three pricing passes.
+    """
+    greeks = _price_batch(S, K, phi, T, r, sigma, N, mode, greeks=True, q=q, dividends=dividends)
+    vol_bumped = _price_batch(S, K, phi, T, r, sigma + vol_bump, N, mode, q=q, dividends=dividends)
+    rate_bumped = _price_batch(S, K, phi, T, r + rate_bump, sigma, N, mode, q=q, dividends=dividends)
+    greeks["vega"] = (vol_bumped - greeks["price"]) / vol_bump
+    greeks["rho"] = (rate_bumped - greeks["price"]) / rate_bump
+    return greeks
+
+
+def binomial_american_option(S, K, T, r, sigma, N, option_type="call", mode="crr", greeks=False,
+                             q=0.0, dividends=None):
+
+    phi = _option_sign(option_type)
+    if greeks:
+        batch = _greeks_batch(*np.atleast_1d(S, K, phi), T, r, np.atleast_1d(sigma), N, mode, q, dividends)
+        return {name: values[0] for name, values in batch.items()}
+    return _price_batch(*np.atleast_1d(S, K, phi), T, r, np.atleast_1d(sigma), N, mode,
+                        q=q, dividends=dividends)[0]
+
+
+def binomial_american_chain(S, K, T, r, sigma, N, option_type="call", mode="crr", greeks=False,
+                            q=0.0, dividends=None):
+    """
+    Price a whole chain of American options, one batched lattice per expiry.
+
+    S, K, T, sigma and option_type may be scalars or arrays and are broadcast
+    against each other. Contracts with the same expiry are rolled back together
+    in one pass; when they also share spot and volatility they share a single
+    column of stock prices.
+
+    Args:
+        S: Current stock price(s).
+        K: Strike price(s).
+        T: Time(s) to expiration (years).
+        r: Risk-free interest rate.
+        sigma: Volatility(ies).
+        N: Number of time steps, used for every expiry.
+        option_type: "call"/"put", or an array of them.
+        mode: Tree construction, one of TREE_MODES.
+        greeks: If True, also compute delta, gamma, theta, vega and rho (about three pricing passes).
+        q: Continuous dividend yield or borrow cost.
+        dividends: Discrete cash dividends of the underlying as (time, amount) pairs.
+    Returns:
+        Array of option prices with the broadcast shape of the inputs, or with
+        greeks=True a dict of such arrays keyed price, delta, gamma, theta, vega, rho.
+    """
+    S, K, T, sigma, phi = np.broadcast_arrays(S, K, T, sigma, _option_sign(option_type))
+    shape = K.shape
+    S, K, T, sigma, phi = (np.ravel(x).astype(float) for x in (S, K, T, sigma, phi))
+
+    names = ("price", "delta", "gamma", "theta", "vega", "rho") if greeks else ("price",)
+    results = {name: np.empty(K.size) for name in names}
+    expiries, expiry_index = np.unique(T, return_inverse=True)
+    for group, T_group in enumerate(expiries):
+        rows = np.flatnonzero(expiry_index == group)
+        S_group, sigma_group = S[rows], sigma[rows]
+        if np.all(S_group == S_group[0]) and np.all(sigma_group == sigma_group[0]):
+            S_group, sigma_group = S_group[:1], sigma_group[:1]
+        if greeks:
+            batch = _greeks_batch(S_group, K[rows], phi[rows], T_group, r, sigma_group, N, mode, q, dividends)
+        else:
+            batch = {"price": _price_batch(S_group, K[rows], phi[rows], T_group, r, sigma_group, N, mode,
+                                           q=q, dividends=dividends)}
+        for name in names:
+            results[name][rows] = batch[name]
+
+    if greeks:
+        return {name: values.reshape(shape) for name, values in results.items()}
+    return results["price"].reshape(shape)
+
+
+def exercise_boundary(K, T, r, sigma, N, option_type="put", mode="crr", q=0.0, dividends=None):
+    """
+    Critical early-exercise boundary S*(t) of an American option, read off a lattice.
+
+    The boundary does not depend on spot, so the lattice is anchored where it
+    can see it: a coarse pass from S = K finds the boundary far from expiry
+    and the full pass is centred there. Within each layer the boundary is
+    placed between nodes using smooth pasting: on the holding side the gap
+    between continuation and exercise value grows like (S - S*)**2, so its
+    square root is extrapolated linearly from the first two held nodes. Early
+    layers whose extreme node falls short of the first boundary value found
+    cannot see it and take that value, where the boundary is flat anyway;
+    with dividends the boundary jumps at each payment, so such layers are
+    left NaN instead.
+
+    Args:
+        K, T, r, sigma, N, option_type, q, dividends: As for binomial_american_option.
+        mode: "crr", "bbs" or "lr" ("bbsr" has no single lattice).
+    Returns:
+        (times, boundary) arrays over t = 0 .. T, in terms of the cum-dividend
+        stock price; boundary is NaN where exercise is never optimal (e.g.
+        calls without dividends, or puts when r <= 0).
+    """
+    if mode == "bbsr":
+        raise ValueError("exercise_boundary needs a single lattice; use 'crr', 'bbs' or 'lr'")
+    phi = _option_sign(option_type)
+    critical, reach = {}, {}
+    # Nodes where exercising and holding are worth the same (e.g. every deep put node when r = 0) are held
+    tol = 1e-12 * K
+
+    def locate(i, stock_prices, exercise_value, continuation_value):
+        stock, gap = stock_prices[:, 0], (exercise_value - continuation_value)[:, 0]
+        # Furthest node into the exercise region: the highest for calls, the lowest for puts
+        reach[i] = stock[-1] if phi > 0 else stock[0]
+        exercised = np.count_nonzero((gap > tol) & (exercise_value[:, 0] > 0))
+        if exercised == 0:
+            return
+        # Puts are exercised on the lowest nodes, calls on the highest.
+        inside = exercised - 1 if phi < 0 else stock.size - exercised
+        held = inside + 1 if phi < 0 else inside - 1
+        beyond = held + 1 if phi < 0 else held - 1
+        root_held, root_beyond = np.sqrt(np.maximum(-gap[[held, beyond]], 0.0)) \
+            if 0 <= beyond < stock.size else (0.0, 0.0)
+        if root_beyond > root_held:
+            critical[i] = stock[held] - root_held * (stock[beyond] - stock[held]) / (root_beyond - root_held)
+        else:
+            critical[i] = stock[inside]
+
+    anchor = K
+    for steps in (max(N // 4, 25), N):
+        critical.clear()
+        reach.clear()
+        _price_batch(*np.atleast_1d(anchor, K, phi), T, r, np.atleast_1d(sigma), steps, mode, observer=locate,
+                     q=q, dividends=dividends)
+        if critical:
+            anchor = critical[min(critical)]
+
+    steps = N + 1 - N % 2 if mode == "lr" else N
+    boundary = np.full(steps + 1, np.nan)
+    for i, value in critical.items():
+        boundary[i] = value
+    if critical and not (dividends is not None and len(dividends)):
+        first = min(critical)
+        for i in range(first):
+            # A layer that reached past the boundary without exercising has none
+            if phi * (reach[i] - critical[first]) < 0:
+                boundary[i] = critical[first]
+    # Limit at expiry: K, moved to K * r / q when the yield makes early exercise pay earlier
+    if phi < 0 and r > 0:
+        boundary[steps] = K * min(1.0, r / q) if q > 0 else K
+    elif phi > 0 and q > 0:
+        boundary[steps] = K * max(1.0, r / q)
+    return np.linspace(0.0, T, steps + 1), boundary
+
+
+def american_price_from_boundary(S, K, T, r, sigma, times, boundary, option_type="put", q=0.0):
+    """
+    Reprice an American option at new spot(s) from a known exercise boundary.
+
+    Uses the early-exercise premium (integral equation) representation,
+    European value plus the integral over the boundary of the interest and
+    dividends gained by holding the exercised position inside the exercise
+    region, evaluated with the
+    trapezoid rule on the boundary's time grid. Cost is O(len(times)) per spot
+    instead of a fresh O(N^2) lattice. Accuracy follows the boundary: with an
+    N=500 boundary prices are typically within about a cent of a converged tree.
+
+    Args:
+        S: Spot price(s); scalar or array.
+        K, T, r, sigma, option_type, q: As for binomial_american_option. Discrete
+            dividends are not supported here.
+        times, boundary: Output of exercise_boundary for the same contract.
+    Returns:
+        Option price(s) with the shape of S.
+    """
+    phi = _option_sign(option_type)
+    S = np.asarray(S, dtype=float)
+    spot = S[..., None]
+    # No boundary means the exercise region is empty: push it out of reach.
+    critical = np.nan_to_num(boundary, nan=np.inf if phi > 0 else 0.0)
+
+    # Probability of being inside the exercise region at t, N(phi * d2), and the
+    # matching share-measure term N(phi * d1); at t = 0 both are just whether
+    # spot already is inside.
+    shape = np.broadcast_shapes(spot.shape, times.shape)
+    inside, inside_share = np.empty(shape), np.empty(shape)
+    inside[..., 0] = inside_share[..., 0] = phi * (S - critical[0]) > 0
+    t = times[1:]
+    with np.errstate(divide="ignore"):
+        d2 = (np.log(spot / critical[1:]) + (r - q - 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+    inside[..., 1:] = ndtr(phi * d2)
+    inside_share[..., 1:] = ndtr(phi * (d2 + sigma * np.sqrt(t)))
+
+    integrand = phi * (q * spot * np.exp(-q * times) * inside_share - r * K * np.exp(-r * times) * inside)
+    premium = np.sum(0.5 * (integrand[..., 1:] + integrand[..., :-1]) * np.diff(times), axis=-1)
+    price = _black_scholes(S, K, T, r, sigma, phi, q) + premium
+    return np.maximum(price, phi * (S - K))
+
+
+class ExerciseBoundaryCache:
+    """
+    LRU cache of early-exercise boundaries for fast American repricing.
+
+    Boundaries are keyed by (option_type, K, T, r, sigma, q). A quoting loop that
+    only moves spot between ticks pays for one lattice per contract and then
+    reprices through american_price_from_boundary.
+    """
+
+    def __init__(self, maxsize=256, N=500, mode="crr"):
+        self.maxsize = maxsize
+        self.N = N
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._boundaries = OrderedDict()
+
+    def __len__(self):
+        return len(self._boundaries)
+
+    def boundary(self, K, T, r, sigma, option_type="put", q=0.0):
+        """Return (times, boundary) for the contract, computing and caching it on a miss."""
+        key = (option_type, float(K), float(T), float(r), float(sigma), float(q))
+        if key in self._boundaries:
+            self.hits += 1
+            self._boundaries.move_to_end(key)
+            return self._boundaries[key]
+
+        self.misses += 1
+        self._boundaries[key] = exercise_boundary(K, T, r, sigma, self.N, option_type, self.mode, q)
+        if len(self._boundaries) > self.maxsize:
+            self._boundaries.popitem(last=False)
+        return self._boundaries[key]
+
+    def price(self, S, K, T, r, sigma, option_type="put", q=0.0):
+        """American price at spot(s) S, reusing the cached boundary."""
+        times, boundary = self.boundary(K, T, r, sigma, option_type, q)
+        return american_price_from_boundary(S, K, T, r, sigma, times, boundary, option_type, q)
+
+    def clear(self):
+        self._boundaries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def compare_tree_modes(S, K, T, r, sigma, option_type="put", steps=(25, 50, 100, 200, 500, 1000, 2000),
+                       modes=TREE_MODES, reference_N=8000, repeat=3):
+    """
+    Accuracy per millisecond of each tree mode against a high-N BBSR reference.
+
+    Args:
+        S, K, T, r, sigma, option_type: Contract, as for binomial_american_option.
+        steps: Values of N to try for every mode.
+        modes: Tree modes to compare.
+        reference_N: Steps of the BBSR tree used as the "true" price.
+        repeat: Timing runs per point; the fastest is reported.
+    Returns:
+        List of dicts with mode, N, price, abs_error and ms, one per (mode, N).
+    """
+    reference = binomial_american_option(S, K, T, r, sigma, reference_N, option_type, "bbsr")
+    rows = []
+    for mode in modes:
+        for N in steps:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                price = binomial_american_option(S, K, T, r, sigma, N, option_type, mode)
+                timings.append(time.perf_counter() - start)
+            rows.append({"mode": mode, "N": N, "price": price,
+                         "abs_error": abs(price - reference), "ms": 1000 * min(timings)})
+    return rows
+
 #graphing example of the tree.
-#This is a very basic graphing example, and for larger N values, the graph will become very cluttered.
-def binomial_tree_graph(S, K, T, r, sigma, N):
+#Large N values are thinned to a coarser view of the same lattice so the graph stays readable and fast.
+def binomial_tree_graph(S, K, T, r, sigma, N, max_nodes=5000, option_type=None, output_file=None, show=True):
+    """
+    Draw the CRR stock price lattice as a single LineCollection.
+
+    Above max_nodes nodes the tree is thinned: only every k-th layer and every
+    k-th node in it is drawn, each joined to the two extreme nodes it can reach
+    k steps later, so the shape of the full lattice is kept with O(max_nodes)
+    artists' worth of segments. With option_type set, nodes are coloured by
+    whether early exercise is optimal there, using exercise_boundary.
+
+    Args:
+        S, K, T, r, sigma, N: As for binomial_american_option.
+        max_nodes: Node budget before layers are thinned.
+        option_type: "call" or "put" to colour the exercise region, or None.
+        output_file: Optional path to save the figure to (e.g. a PNG).
+        show: Whether to open the plot window.
+    Returns:
+        The matplotlib Figure.
+    """
+    # matplotlib is only needed here, so pricing imports stay light (e.g. in worker processes)
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
     dt = T / N
     u = np.exp(sigma * np.sqrt(dt))
     d = 1 / u
-    stock_prices = np.zeros((N + 1, N + 1))
-    stock_prices[0, 0] = S
-    for i in range(1, N + 1):
-        stock_prices[i, 0] = stock_prices[i - 1, 0] * d
-        for j in range(1, i + 1):
-            stock_prices[i, j] = stock_prices[i - 1, j - 1] * u
-
-    for i in range(N):
-        for j in range(i + 1):
-            plt.plot([i, i + 1], [stock_prices[i, j], stock_prices[i + 1, j]], 'b-')
-            plt.plot([i, i + 1], [stock_prices[i, j], stock_prices[i + 1, j + 1]], 'b-')
-    plt.show()
-
-binomial_tree_graph(S, K, .25, r, sigma, 4)
\ No newline at end of file
+
+    # Thinned lattice: layers i = 0, k, 2k, ... and nodes j = 0, k, 2k, ... within them
+    k = max(1, int(np.ceil(N / np.sqrt(2 * max_nodes))))
+    layers = N // k
+    layer, node = np.tril_indices(layers + 1)
+    i, j = layer * k, node * k
+    stock_prices = S * u ** j * d ** (i - j)
+
+    parent = layer < layers
+    x0, j0, y0 = i[parent], j[parent], stock_prices[parent]
+    x1 = x0 + k
+    segments = np.concatenate([
+        np.stack([np.column_stack([x0, y0]), np.column_stack([x1, S * u ** j0 * d ** (x1 - j0)])], axis=1),
+        np.stack([np.column_stack([x0, y0]), np.column_stack([x1, S * u ** (j0 + k) * d ** (x1 - j0 - k)])], axis=1),
+    ])
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.add_collection(LineCollection(segments, colors="b", linewidths=0.5))
+
+    if option_type is not None:
+        phi = _option_sign(option_type)
+        _, boundary = exercise_boundary(K, T, r, sigma, N, option_type)
+        exercised = phi * (stock_prices - K) > 0
+        inside = phi * (stock_prices - boundary[i]) >= 0
+        exercised &= np.where(i < N, inside, True)
+        ax.scatter(i[~exercised], stock_prices[~exercised], s=4, c="tab:blue", label="Hold", zorder=2)
+        ax.scatter(i[exercised], stock_prices[exercised], s=4, c="tab:red", label="Exercise", zorder=2)
+        ax.legend()
+
+    ax.autoscale()
+    ax.set_xlabel("Step" if k == 1 else f"Step (every {k}th layer shown)")
+    ax.set_ylabel("Stock Price ($)")
+    ax.set_title(f"Binomial Tree, N={N}")
+
+    if output_file:
+        fig.savefig(output_file, dpi=150, bbox_inches="tight")
+    if show:
+        plt.show()
+    return fig
+
+
+# Example usage (see binomial_cli.py for a command line entry point)
+if __name__ == "__main__":
+    S = 100  # Current stock price
+    K = 100  # Strike price
+    T = 1    # Time to expiration (years)
+    r = 0.05 # Risk-free interest rate
+    sigma = 0.2 # Volatility
+    N = 200   # Number of time steps
+
+    call_price = binomial_american_option(S, K, T, r, sigma, N, "call")
+    put_price = binomial_american_option(S, K, T, r, sigma, N, "put")
+
+    print(f"American Call Option Price: {call_price}")
+    print(f"American Put Option Price: {put_price}")
+    print("\n.. starting the plotting.. \n This code generates a graphical representation of a binomial tree model for stock prices. It calculates the possible stock prices at each time step (N steps) based on the given parameters (S initial stock price, K strike price, T time to expiration, r risk-free interest rate, and sigma volatility) and plots the resulting tree structure using matplotlib.")
+
+    binomial_tree_graph(S, K, .25, r, sigma, 4)
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from binomial_pricing_model import exercise_boundary
+
+
+@pytest.mark.parametrize("mode", ["crr", "bbs", "lr"])
+def test_no_put_boundary_without_interest(mode):
+    # With r = q = 0 holding a put is never worse than exercising it
+    _, boundary = exercise_boundary(100.0, 1.0, 0.0, 0.2, 200, "put", mode)
+    assert np.all(np.isnan(boundary))
+
+
+def test_put_boundary_below_strike():
+    times, boundary = exercise_boundary(100.0, 1.0, 0.05, 0.2, 200, "put")
+    assert times[0] == 0.0 and times[-1] == 1.0
+    assert not np.isnan(boundary).any()
+    assert np.all(boundary <= 100.0)
+    assert boundary[-1] == 100.0
+
@@ -0,0 +1,184 @@
+import os
+import json
+import datetime
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:
+    # Not POSIX (e.g. Windows): files are still replaced atomically, but not locked
+    fcntl = None
+
+'''
+    ** Local OHLCV bar cache shared by StockData and its subclasses.
+
+    1. Bars are stored one Parquet file per ticker and interval: BAR_CACHE/<interval>/<ticker>.parquet
+    2. The file also records the date range it covers (in the Parquet metadata), so a request inside
+       that range is served from disk without touching the network.
+    3. A request reaching outside it fetches only the missing range(s) before and/or after,
+       appends them and rewrites the file; a nightly refresh therefore downloads one day per ticker.
+    4. Today is never marked as covered, since its bar may still be moving; it is fetched again
+       (and replaced) on the next request.
+    5. Prices are split- and dividend-adjusted (yfinance auto_adjust=True), as yf.download and
+       Ticker.history gave StockData before the cache, so 'Close' is the adjusted close. Yahoo restates
+       every earlier adjusted price when a split or dividend happens, so a top-up that brings in a
+       split or dividend the file does not record yet re-downloads the whole covered range instead of
+       appending to bars on the old adjustment basis.
+    6. Each file has a <file>.lock next to it, locked with fcntl: shared while reading, exclusive while
+       topping up, so several processes (e.g. sweep workers) can share one cache directory. Files are
+       written to a temporary name and renamed, so a reader never sees half a file. Without fcntl
+       (non-POSIX platforms) there is no locking, so only one process should use a cache directory.
+'''
+
+METADATA_KEY = b"bar_cache"
+BAR_COLUMNS = ("Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits")
+ACTION_COLUMNS = ("Dividends", "Stock Splits")
+
+
+def _timestamp(value):
+    """Any date-like value as a tz-naive pandas Timestamp."""
+    value = pd.Timestamp(value)
+    return value.tz_localize(None) if value.tzinfo is not None else value
+
+
+def fetch_yfinance(ticker, start, end, interval):
+    """Download adjusted bars for [start, end) with yfinance, with a tz-naive index (exchange local time)."""
+    import yfinance as yf
+
+    bars = yf.Ticker(ticker).history(start=start, end=end, interval=interval, auto_adjust=True, actions=True,
+                                     timeout=20)
+    if bars.index.tz is not None:
+        bars.index = bars.index.tz_localize(None)
+    return bars
+
+
+def _has_new_actions(bars, piece):
+    """
+    Whether piece has a split or dividend the cached bars do not record yet, which restates all
+    earlier adjusted prices. One already cached (e.g. on today's bar, fetched again on every
+    request that day) does not count.
+    """
+    for column in ACTION_COLUMNS:
+        if column not in piece:
+            continue
+        actions = piece[column].fillna(0)
+        cached = bars[column].reindex(actions.index).fillna(0) if column in bars else 0
+        if (actions.ne(0) & actions.ne(cached)).any():
+            return True
+    return False
+
+
+def _read_bars(path):
+    """Bars and covered (start, end) of a cache file, or (None, None) if it does not exist."""
+    if not os.path.exists(path):
+        return None, None
+    table = pq.read_table(path)
+    coverage = json.loads(table.schema.metadata[METADATA_KEY])
+    return table.to_pandas(), (pd.Timestamp(coverage["start"]), pd.Timestamp(coverage["end"]))
+
+
+def _write_bars(path, bars, coverage):
+    """Write bars and their covered range atomically (temporary file + rename)."""
+    table = pa.Table.from_pandas(bars)
+    metadata = {**(table.schema.metadata or {}),
+                METADATA_KEY: json.dumps({"start": coverage[0].isoformat(), "end": coverage[1].isoformat()})}
+    temporary = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), temporary)
+    os.replace(temporary, path)
+
+
+SHARED, EXCLUSIVE = (fcntl.LOCK_SH, fcntl.LOCK_EX) if fcntl else (None, None)
+
+
+@contextmanager
+def _locked(path, mode):
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class BarCache:
+    def __init__(self, directory="BAR_CACHE", fetch=fetch_yfinance):
+        """
+        Parameters:
+        directory (str): Root folder of the cache files.
+        fetch (callable): fetch(ticker, start, end, interval) -> DataFrame of bars for [start, end)
+                          indexed by tz-naive timestamps; defaults to yfinance.
+        """
+        self.directory = directory
+        self.fetch = fetch
+
+    def path(self, ticker, interval="1d"):
+        folder = os.path.join(self.directory, interval)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{ticker.replace(os.sep, '_')}.parquet")
+
+    def get(self, ticker, start, end=None, interval="1d"):
+        """
+        Bars of ticker for [start, end), served from disk and topped up from the network as needed.
+
+        Parameters:
+        ticker (str): Ticker symbol, e.g. "^GSPC".
+        start, end (date-like): Range to return; end is exclusive and defaults to tomorrow (today included).
+        interval (str): yfinance bar interval, e.g. "1d", "1h".
+
+        Returns:
+        DataFrame of adjusted Open, High, Low, Close, and Volume, Dividends and Stock Splits, indexed by
+        bar time.
+        """
+        today = pd.Timestamp(datetime.date.today())
+        start = _timestamp(start)
+        end = _timestamp(end) if end is not None else today + pd.Timedelta(days=1)
+        if not interval.endswith(("m", "h")):
+            # Daily and longer bars are stamped at midnight; compare whole dates as yfinance does
+            start, end = start.normalize(), end.normalize()
+        path = self.path(ticker, interval)
+
+        with _locked(path, SHARED):
+            bars, coverage = _read_bars(path)
+        if coverage is None or start < coverage[0] or end > coverage[1]:
+            with _locked(path, EXCLUSIVE):
+                # Another process may have topped the file up while we waited for the lock
+                bars, coverage = self._top_up(ticker, interval, path, start, end, today)
+
+        return bars[(bars.index >= start) & (bars.index < end)].copy()
+
+    def _top_up(self, ticker, interval, path, start, end, today):
+        """Fetch the parts of [start, end) the file does not cover, append them and rewrite it."""
+        bars, coverage = _read_bars(path)
+        if coverage is None:
+            before, after = None, (start, end)
+            coverage = (start, min(end, today))
+        else:
+            before = (start, coverage[0]) if start < coverage[0] else None
+            after = (coverage[1], end) if end > coverage[1] else None
+            coverage = (min(start, coverage[0]), max(min(end, today), coverage[1]))
+        if before is None and after is None:
+            return bars, coverage
+
+        pieces = [self.fetch(ticker, *after, interval)] if after else []
+        if bars is not None and pieces and pieces[0] is not None and _has_new_actions(bars, pieces[0]):
+            # A new split or dividend changes the adjustment of the cached bars: download everything again
+            bars, pieces = None, [self.fetch(ticker, coverage[0], max(end, coverage[1]), interval)]
+        elif before:
+            pieces.append(self.fetch(ticker, *before, interval))
+        pieces = ([bars] if bars is not None else []) + [piece for piece in pieces
+                                                         if piece is not None and not piece.empty]
+        if not pieces:
+            # Nothing to store (e.g. an unknown ticker); do not record any coverage
+            return pd.DataFrame(columns=list(BAR_COLUMNS), index=pd.DatetimeIndex([]), dtype=float), (start, start)
+
+        bars = pd.concat(pieces)
+        bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+        _write_bars(path, bars, coverage)
+        return bars, coverage
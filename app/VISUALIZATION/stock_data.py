@@ -31,6 +31,8 @@ import matplotlib.dates as mdates
 
 from fpdf import FPDF
 
+from bar_cache import BarCache
+
 ## TODO: Refactor the class to store data in memory and access it through methods.
 ### TODO: MAKE SURE TO USE METHODS TO ACCESS DATA, NOT STORE DATA IN MEMORY
 ### TODO: DO NOT GET CONVENTIONAL "DF" CONFUSED WITH OTHER DATAFRAMES AND METHOD CALLS
@@ -107,6 +109,10 @@ class FinancialDataDownloader:
 
 
 class StockData:
+    # OHLCV bars are read through a shared on-disk cache; only missing date ranges are downloaded.
+    # Prices are split- and dividend-adjusted ('Close' is the adjusted close), as yf.download returned them.
+    bar_cache = BarCache()
+
     def __init__(self):
         """Initialize the class and prompt the user for input."""
         # Get user input
@@ -126,8 +132,7 @@ class StockData:
 
         # self.df = None
 
-        self.df = yf.download(self.ticker, start=self.start_date.strftime('%Y-%m-%d'),
-                              end=self.end_date.strftime('%Y-%m-%d'))
+        self.df = self.bar_cache.get(self.ticker, self.start_date, self.end_date)
         self.df['Date'] = self.df.index
         self.df['Price'] = self.df['Close']
 
@@ -167,8 +172,7 @@ class StockData:
     def simple_regression(self):
 
         try:
-            self.df = yf.download(self.ticker, start=self.start_date.strftime('%Y-%m-%d'),
-                                  end=self.end_date.strftime('%Y-%m-%d'))
+            self.df = self.bar_cache.get(self.ticker, self.start_date, self.end_date)
             self.df['Date'] = self.df.index
             self.df['Price'] = self.df['Close']
 
@@ -289,7 +293,7 @@ class StockData:
         # print(f"Fetching data for ticker '{self.ticker}' between {start_date} and {end_date}.")
 
 
-        self.df = yf.download(self.ticker, start=start_date, end=end_date, timeout=20)
+        self.df = self.bar_cache.get(self.ticker, start_date, end_date)
         if self.df.empty:
             print(f"No data found for ticker '{self.ticker}' between {start_date} and {end_date}.")
             return False
@@ -300,7 +304,7 @@ class StockData:
 
     def fetch_data(self):
         try:
-            self.df = yf.download(self.ticker, start=self.start_date, end=self.end_date, timeout=20)
+            self.df = self.bar_cache.get(self.ticker, self.start_date, self.end_date)
 
             if self.df.empty:
                 print(
@@ -334,8 +338,7 @@ class StockData:
         if end_date is None:
             end_date = datetime.datetime.today()
 
-        self.df = yf.download(self.ticker, start=start_date.strftime('%Y-%m-%d'),
-                              end=end_date.strftime('%Y-%m-%d'))
+        self.df = self.bar_cache.get(self.ticker, start_date, end_date)
         if self.df.empty:
             print(f"No data found for ticker '{self.ticker}' between {start_date} and {end_date}.")
             return False
@@ -360,7 +363,7 @@ class StockData:
 
             # Fetch historical market data
             try:
-                historical_data = ticker_obj.history(start=self.start_date, end=self.end_date)
+                historical_data = self.bar_cache.get(self.ticker, self.start_date, self.end_date)
                 description = 'historical_data'
                 file_destination = os.path.join("STOCK_RESULTS", f"{self.ticker}_{description}")
                 csv_filename = os.path.join("STOCK_RESULTS", f"{self.ticker}_{description}.csv")
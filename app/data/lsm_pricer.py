@@ -0,0 +1,177 @@
+import numpy as np
+
+from monte_carlo import MonteCarloEstimate, chunk_rng, _root_seed
+
+
+''' Longstaff-Schwartz (least-squares Monte Carlo) pricing of American/Bermudan options.
+
+    Cross-check for the binomial tree (app/TOOLS/options_pricing/binomial) that also covers what
+    a recombining lattice cannot: payoffs that depend on the whole path (e.g. Asian) and on
+    several correlated assets (e.g. baskets).
+
+    Pricing runs in two phases so memory stays bounded whatever the path count:
+        1. Training: n_train risk-neutral paths are held in memory and rolled back over the
+           exercise dates. At each date the continuation value of the in-the-money paths is
+           regressed on a polynomial or Laguerre basis of the state (one least-squares solve
+           per date), giving an exercise rule.
+        2. Pricing: n_paths fresh paths are generated chunk_size at a time and exercised
+           forward with that fixed rule. Only running sums are kept, and because the rule was
+           fitted on other paths the estimate is not biased upwards by foresight.
+
+    Paths have shape (paths, assets, steps + 1), column 0 being today. A payoff is a callable
+    payoff(paths, t) giving the exercise value of every path at step t; it may look at the
+    whole history paths[:, :, :t + 1].
+'''
+
+
+def vanilla_payoff(K, option_type="put", asset=0):
+    """Exercise value of a call/put on one asset."""
+    phi = 1.0 if option_type == "call" else -1.0
+    return lambda paths, t: np.maximum(phi * (paths[:, asset, t] - K), 0)
+
+
+def basket_payoff(K, weights, option_type="put"):
+    """Exercise value of a call/put on the weighted sum of the assets."""
+    phi = 1.0 if option_type == "call" else -1.0
+    weights = np.asarray(weights, dtype=float)
+    return lambda paths, t: np.maximum(phi * (paths[:, :, t] @ weights - K), 0)
+
+
+def asian_payoff(K, option_type="put", asset=0):
+    """Exercise value of a call/put on the arithmetic average of one asset's prices up to t (today excluded)."""
+    phi = 1.0 if option_type == "call" else -1.0
+    return lambda paths, t: np.maximum(phi * (paths[:, asset, 1:t + 1].mean(axis=1) - K), 0) if t > 0 \
+        else np.maximum(phi * (paths[:, asset, 0] - K), 0)
+
+
+def simulate_risk_neutral_paths(S, T, r, sigma, steps, n_paths, q=0.0, correlation=None, rng=None):
+    """
+    Correlated risk-neutral GBM paths.
+
+    Args:
+        S, sigma, q: Spot, volatility and dividend yield per asset (scalars for one asset).
+        T: Time to expiration (years).
+        r: Risk-free interest rate.
+        steps: Time steps (exercise dates).
+        n_paths: Number of paths.
+        correlation: Asset correlation matrix; identity if None.
+        rng: numpy.random.Generator to draw from; a freshly seeded one if None.
+    Returns:
+        Array of shape (n_paths, assets, steps + 1).
+    """
+    S, sigma, q = np.broadcast_arrays(np.atleast_1d(np.asarray(S, dtype=float)), np.asarray(sigma, dtype=float),
+                                      np.asarray(q, dtype=float))
+    assets = S.size
+    dt = T / steps
+    normals = (rng or np.random.default_rng()).standard_normal(size=(n_paths, steps, assets))
+    if correlation is not None:
+        normals = normals @ np.linalg.cholesky(np.asarray(correlation, dtype=float)).T
+
+    increments = (r - q - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * normals
+    log_paths = np.concatenate([np.zeros((n_paths, 1, assets)), np.cumsum(increments, axis=1)], axis=1)
+    return (S * np.exp(log_paths)).transpose(0, 2, 1)
+
+
+def _basis(state, degree, kind):
+    """
+    Regression basis of a (paths, features) state: a constant, degree terms per feature, and
+    the pairwise products of the features when there are several.
+    """
+    columns = [np.ones(len(state))]
+    for x in state.T:
+        if kind == "laguerre":
+            # Weighted Laguerre polynomials, as in Longstaff and Schwartz (2001)
+            weight = np.exp(-0.5 * x)
+            previous, current = np.ones_like(x), 1 - x
+            columns.append(weight * current)
+            for n in range(1, degree):
+                previous, current = current, ((2 * n + 1 - x) * current - n * previous) / (n + 1)
+                columns.append(weight * current)
+        else:
+            columns += [x ** power for power in range(1, degree + 1)]
+    for i in range(state.shape[1]):
+        for j in range(i + 1, state.shape[1]):
+            columns.append(state[:, i] * state[:, j])
+    return np.column_stack(columns)
+
+
+def lsm_american_option(S, T, r, sigma, payoff, steps=50, n_paths=100_000, q=0.0, correlation=None, state=None,
+                        basis="laguerre", degree=3, n_train=20_000, chunk_size=10_000, seed=None):
+    """
+    Price an American (Bermudan, exercisable at each of the steps) option by least-squares Monte Carlo.
+
+    Args:
+        S, T, r, sigma, q, correlation: Market as for simulate_risk_neutral_paths.
+        payoff: Callable payoff(paths, t), e.g. vanilla_payoff(K, "put").
+        steps: Exercise dates, evenly spaced over (0, T].
+        n_paths: Paths in the pricing phase.
+        q: Dividend yield(s).
+        state: Callable state(paths, t) giving the (paths, features) regression state; defaults
+            to the asset prices at t. Path-dependent payoffs should add what they depend on
+            (e.g. the running average).
+        basis: "laguerre" or "polynomial".
+        degree: Basis terms per feature.
+        n_train: Paths used to fit the exercise rule.
+        chunk_size: Paths generated and held in memory at a time in the pricing phase.
+        seed: Seed (int or SeedSequence). The training paths draw from its child 0 and pricing
+            chunk k from child k + 1 (see monte_carlo.chunk_rng).
+    Returns:
+        monte_carlo.MonteCarloEstimate of the price (a low-biased estimate) and its standard error.
+    """
+    if state is None:
+        state = lambda paths, t: paths[:, :, t]
+    disc = np.exp(-r * T / steps)
+
+    # Phase 1: fit the continuation value at every exercise date, backwards
+    root = _root_seed(seed)
+    paths = simulate_risk_neutral_paths(S, T, r, sigma, steps, n_train, q, correlation, chunk_rng(root, 0))
+    # Features are scaled to order one so the Laguerre weights and polynomial powers stay well conditioned
+    scale = np.mean(np.abs(state(paths, steps)), axis=0)
+    scale[scale == 0] = 1.0
+    cashflow = payoff(paths, steps)
+    coefficients = [None] * (steps + 1)
+    for t in range(steps - 1, 0, -1):
+        cashflow = cashflow * disc
+        exercise = payoff(paths, t)
+        itm = exercise > 0
+        if itm.sum() <= 2 * degree * np.size(scale) + 1:
+            continue
+        X = _basis(state(paths[itm], t) / scale, degree, basis)
+        coefficients[t] = np.linalg.lstsq(X, cashflow[itm], rcond=None)[0]
+        continuation = X @ coefficients[t]
+        exercised = np.flatnonzero(itm)[exercise[itm] >= continuation]
+        cashflow[exercised] = exercise[exercised]
+    hold_value = np.mean(cashflow * disc)
+    del paths, cashflow
+
+    # Phase 2: exercise fresh paths forward with the fitted rule, chunk by chunk
+    total, total_sq = 0.0, 0.0
+    for chunk, start in enumerate(range(0, n_paths, chunk_size), start=1):
+        paths = simulate_risk_neutral_paths(S, T, r, sigma, steps, min(chunk_size, n_paths - start), q, correlation,
+                                            chunk_rng(root, chunk))
+        value = np.zeros(len(paths))
+        alive = np.ones(len(paths), dtype=bool)
+        for t in range(1, steps + 1):
+            exercise = payoff(paths, t)
+            if t == steps:
+                stop = alive & (exercise > 0)
+            elif coefficients[t] is None:
+                continue
+            else:
+                stop = alive & (exercise > 0)
+                rows = np.flatnonzero(stop)
+                continuation = _basis(state(paths[rows], t) / scale, degree, basis) @ coefficients[t]
+                stop[rows] = exercise[rows] >= continuation
+            value[stop] = exercise[stop] * disc ** t
+            alive &= ~stop
+        total += value.sum()
+        total_sq += value @ value
+
+    mean = total / n_paths
+    std_error = np.sqrt(max(total_sq / n_paths - mean ** 2, 0.0) / (n_paths - 1))
+
+    # Exercising today beats holding when the immediate payoff exceeds the value of waiting
+    today = float(payoff(np.atleast_1d(np.asarray(S, dtype=float))[None, :, None], 0)[0])
+    if today > max(mean, hold_value):
+        return MonteCarloEstimate(today, 0.0, n_paths)
+    return MonteCarloEstimate(float(mean), float(std_error), n_paths)
@@ -29,6 +29,14 @@ import matplotlib.dates as mdates
 from stock_data import StockData
 from stock_data import FinancialDataDownloader
 from stock_data import StockVisualizer
+from put_strategy import black_scholes_put, roll_put_strategy, evaluate_put_roll
+from monte_carlo import iter_gbm_paths, monte_carlo_estimate, simulate_sobol_paths, qmc_estimate, \
+    monte_carlo_greeks, terminal_put_gradient
+from parameter_sweep import parameter_grid, sweep_put_roll
+from lsm_pricer import lsm_american_option, vanilla_payoff
+from path_models import GBMModel
+from risk_sketch import StreamingRisk
+from simulation_output import build_result, INTERACTIVE_SINKS
 #from simple_regression_scratch import StockPredictor
 #from simple_regression_scratch import SimpleLinearRegressor
 
@@ -442,224 +450,157 @@ class StockPredictorPolynomial(StockData):
             print("Data fetching failed. Exiting.")
 
 class OptionSimulator:
-    def __init__(self, parameters):
+    def __init__(self, parameters, seed=42, model=None):
         self.parameters = parameters
+        self.seed = seed  # Root of every random stream the simulator uses (see monte_carlo.chunk_rng)
+        self.model = model or GBMModel()  # Stock path model, e.g. path_models.HestonModel, LocalVolModel or MertonJumpModel
         self.adjusted_time_step = 1 / self.parameters.time_step  # Time step in years (assuming 252 trading days per year)
         self.borrowed_amount = self.parameters.num_shares * self.parameters.initial_equity_price * (
                 1 - self.parameters.margin_requirement)
         self.daily_margin_rate = self.parameters.margin_rate / self.parameters.time_step
         self.total_margin_interest = 0
 
-        self.run_simulation = self.run_simulation()
-
+    def simulate_stock_prices(self, n_paths=None, antithetic=False, sobol=False, rng=None):
+        """
+        Simulate stock prices using geometric Brownian motion.
 
-    def simulate_stock_prices(self):
-        """Simulate stock prices using geometric Brownian motion."""
-        t = np.linspace(0, self.parameters.time_horizon * self.adjusted_time_step, self.parameters.time_horizon_step)
-        randomness = np.random.standard_normal(size=self.parameters.time_horizon_step)
-        randomness = np.cumsum(randomness) * np.sqrt(self.adjusted_time_step)
-        coeff = (self.parameters.annual_expected_return - 0.5 * self.parameters.volatility ** 2) * t \
-                + self.parameters.volatility * randomness
-        new_stock_price = self.parameters.initial_equity_price * np.exp(coeff)
-        return new_stock_price
+        With n_paths set, returns an (n_paths x time_horizon_step) array instead of one path;
+        antithetic=True mirrors the second half of the paths' draws, and sobol=True uses
+        scrambled Sobol points with Brownian-bridge construction instead (see monte_carlo.py).
+        rng is the numpy.random.Generator to draw from; defaults to one seeded with self.seed.
+        Paths follow self.model (GBM with constant volatility unless another model was given).
+        """
+        rng = rng or np.random.default_rng(self.seed)
+        if n_paths is not None and sobol:
+            if not isinstance(self.model, GBMModel):
+                raise ValueError("Sobol paths are only available for the GBM model")
+            return simulate_sobol_paths(self.parameters, n_paths, rng)
+        if n_paths is not None:
+            return self.model.simulate(self.parameters, n_paths, antithetic, rng)
+        return self.model.simulate(self.parameters, 1, rng=rng)[0]
+
+    def iter_stock_paths(self, n_paths, chunk_size=10_000, antithetic=False):
+        """
+        Stream n_paths simulated paths in (chunk_size x time_horizon_step) chunks, for runs too large for memory.
 
-    def black_scholes_put(self, equity_price, put_strike, time_to_expiration):
-        """Calculate the price of a put option using the Black-Scholes model."""
-        if time_to_expiration <= 0:
-            return max(put_strike - equity_price, 0)
-        d1 = (np.log(equity_price / put_strike) + (
-                self.parameters.risk_free_rate + 0.5 * self.parameters.volatility ** 2) * time_to_expiration) / (
-                     self.parameters.volatility * np.sqrt(time_to_expiration))
-        d2 = d1 - self.parameters.volatility * np.sqrt(time_to_expiration)
-        put_price = put_strike * np.exp(-self.parameters.risk_free_rate * time_to_expiration) * norm.cdf(-d2) \
-                    - equity_price * norm.cdf(-d1)
-        return put_price
+        Each chunk has its own stream spawned from self.seed; see monte_carlo.regenerate_paths to
+        rebuild single paths of the run.
+        """
+        return iter_gbm_paths(self.parameters, n_paths, chunk_size, antithetic, self.seed, self.model)
 
-    def plot_stock_prices(self, prices):
-        """Plot the simulated stock prices over time."""
-        today = dt.datetime.today()
-        formatted_date = today.strftime('%Y-%m-%d')
+    def estimate_position_value(self, n_paths, chunk_size=10_000, antithetic=True, control_variate=True, sobol=False,
+                                replicates=16):
+        """
+        Monte Carlo estimate of the expected final Total Position Value of the put roll strategy.
 
-        dates = pd.date_range(start=f'{formatted_date}', periods=len(prices), freq='B')
-        df = pd.DataFrame({'Date': dates, 'Price': prices})
+        Paths are streamed in chunks; the terminal put payoff at strike_price_PUT, priced in closed
+        form, is used as a control variate (skipped for models with no terminal_put_mean, such as
+        path_models.LocalVolModel). With sobol=True, n_paths Sobol points (a power of two)
+        are used in each of replicates scramblings instead, and the standard error comes from the
+        spread of the replicates. Returns a monte_carlo.MonteCarloEstimate.
+        """
+        final_value = lambda paths: roll_put_strategy(paths, self.parameters)["position_value"][:, -1]
+        if sobol:
+            if not isinstance(self.model, GBMModel):
+                raise ValueError("Sobol paths are only available for the GBM model")
+            return qmc_estimate(self.parameters, final_value, n_paths, replicates, seed=self.seed)
+        control_variate = control_variate and hasattr(self.model, "terminal_put_mean")
+        return monte_carlo_estimate(self.parameters, final_value, n_paths, chunk_size, antithetic, control_variate,
+                                    seed=self.seed, model=self.model)
+
+    def put_greeks(self, put_strike=None, n_paths=100_000, chunk_size=10_000, antithetic=True):
+        """
+        Monte Carlo price, delta, vega and gamma of the terminal put max(K - S_T, 0), from one simulation.
 
+        Delta and vega are pathwise and gamma a likelihood-ratio estimate, all from the same draws
+        (see monte_carlo.monte_carlo_greeks); put_strike defaults to strike_price_PUT. Returns a
+        monte_carlo.MonteCarloGreeks, each Greek with its standard error.
+        """
+        if not isinstance(self.model, GBMModel):
+            raise ValueError("Monte Carlo Greeks are only available for the GBM model")
+        put_strike = self.parameters.strike_price_PUT if put_strike is None else put_strike
+        return monte_carlo_greeks(self.parameters, lambda paths: np.maximum(put_strike - paths[:, -1], 0),
+                                  terminal_put_gradient(put_strike), n_paths, chunk_size, antithetic, self.seed,
+                                  gamma_step=-1)
+
+    def backtest_put_roll(self, n_paths, chunk_size=10_000, antithetic=False):
+        """
+        Run the put roll of run_simulation over n_paths simulated paths, without printing or plotting.
 
+        Paths are streamed in chunks. Returns a put_strategy.StrategyDistribution of final Total
+        Position Value, roll day, margin interest and max drawdown; see its summary() method.
+        """
+        return evaluate_put_roll(self.iter_stock_paths(n_paths, chunk_size, antithetic), self.parameters)
 
+    def position_risk(self, n_paths, chunk_size=10_000, levels=(0.95, 0.99), confidence=0.95, antithetic=False):
+        """
+        VaR and Expected Shortfall of the put roll strategy's final Total Position Value.
 
-        plt.figure(figsize=(12, 6))
-        plt.plot(df['Date'], df['Price'], label='Stock Price')
-        plt.title(f'Simulated Stock Prices over {self.parameters.time_horizon} Days with Varying Volatility')
-        plt.xlabel('Date')
-        plt.ylabel('Price ($)')
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
+        Losses are measured from the initial position value (shares plus puts at strike_price_PUT).
+        Paths are streamed in chunks into a risk_sketch.StreamingRisk, so memory does not grow
+        with n_paths. Returns its report: one dict per level with VaR, ES and their confidence
+        intervals.
+        """
+        initial_value = self.parameters.num_shares * self.parameters.initial_equity_price \
+                        + self.parameters.num_puts * 100 * self.black_scholes_put(
+                            self.parameters.initial_equity_price, self.parameters.strike_price_PUT,
+                            self.parameters.time_horizon * self.adjusted_time_step)
+        risk = StreamingRisk(levels, reference=float(initial_value))
+        for paths in self.iter_stock_paths(n_paths, chunk_size, antithetic):
+            risk.update(roll_put_strategy(paths, self.parameters)["position_value"][:, -1])
+        return risk.report(confidence)
+
+    def sweep_parameters(self, n_paths=10_000, workers=None, checkpoint=None, **ranges):
+        """
+        Backtest the put roll for every combination of the given Parameters field values.
 
-        description = 'simulated_stock_prices'
-        output_file = f"{description}.png"
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        print(f'[!] Graph saved to {output_file}')
+        Example: simulator.sweep_parameters(trigger_price=[105, 110, 115], num_puts=[5, 10],
+        checkpoint="BLACK_SCHOLES_RESULTS/sweep.csv"). Scenarios run across a process pool and
+        resume from the checkpoint CSV if given; paths follow self.model. See
+        parameter_sweep.sweep_put_roll.
+        """
+        return sweep_put_roll(self.parameters, parameter_grid(**ranges), n_paths, self.seed, workers, checkpoint,
+                              model=self.model)
 
-    def run_simulation(self):
-        """Run the main simulation logic."""
-        # Initialize variables
-        position_values = []
-        put_strike_prices = []
-        put_option_values = []
-        actions = []
-        margin_interests = []
-
-        borrowed_amount = self.parameters.num_shares * self.parameters.initial_equity_price * (
-                1 - self.parameters.margin_requirement)
-        daily_margin_rate = self.parameters.margin_rate / self.parameters.time_step
-        total_margin_interest = 0
-
-        # Step 1: Simulate Prices
-        np.random.seed(42)
-        simulated_price_index = self.simulate_stock_prices()
-
-        # Prepare pandas DataFrame
-        dates = pd.date_range(start='2023-01-01', periods=self.parameters.time_horizon_step, freq='B')
-        df = pd.DataFrame({'Date': dates, 'Stock Price': simulated_price_index})
-
-        # Save simulated stock prices to CSV
-        description = "simulated_stock_prices"
-        os.makedirs("BLACK_SCHOLES_RESULTS", exist_ok=True)
-        csv_filename = os.path.join("BLACK_SCHOLES_RESULTS", f"{description}.csv")
-        df.to_csv(csv_filename, index=False)
-        print(f"\n[!] Data saved to {csv_filename}\n")
-
-        # Plot stock prices
-        self.plot_stock_prices(simulated_price_index)
-
-        # Initial put option
-        T_initial = self.parameters.time_horizon * self.adjusted_time_step
-        put_price = self.black_scholes_put(
-            self.parameters.initial_equity_price,
-            self.parameters.strike_price_PUT,
-            T_initial
-        )
-        put_option_value = self.parameters.num_puts * 100 * put_price
-        current_put_strike = self.parameters.strike_price_PUT
-        action = f'Bought initial puts at {self.parameters.strike_price_PUT}'
-        actions.append(action)
-
-        # Main simulation loop
-        for day in range(self.parameters.time_horizon_step):
-            day_stock = df['Stock Price'].iloc[day]
-            adjusted_time_to_expiration = (self.parameters.time_horizon - day) * self.adjusted_time_step
-            interest = borrowed_amount * daily_margin_rate
-            total_margin_interest += interest
-
-            # Check for trigger to adjust puts
-            if day_stock >= self.parameters.trigger_price and current_put_strike == self.parameters.strike_price_PUT:
-                print("\n[!] Trigger price reached. Adjusting put options...")
-                print("... Selling puts and buying new puts with higher strike price")
-                time.sleep(0.1)
-
-                put_price_sell = self.black_scholes_put(day_stock, self.parameters.strike_price_PUT,
-                                                        adjusted_time_to_expiration)
-                proceeds = self.parameters.num_puts * 100 * put_price_sell
-                print(f"\n[+] Sold puts at ${self.parameters.strike_price_PUT} for ${proceeds:.2f}")
-                time.sleep(0.25)
-
-                # Buy new puts with higher strike price
-                current_put_strike = self.parameters.trigger_price_PUT
-                remaining_days = self.parameters.time_horizon - day
-                T_new = remaining_days * self.adjusted_time_step
-                put_price_buy = self.black_scholes_put(day_stock, self.parameters.trigger_price_PUT, T_new)
-                put_option_value = self.parameters.num_puts * 100 * put_price_buy
-
-                print(f".. Bought puts at K=${self.parameters.trigger_price_PUT} for ${put_option_value:.2f}")
-                time.sleep(0.25)
-
-                print(
-                    f"\n[RESULTS] \n[+] Day {day} Bought puts at ${self.parameters.trigger_price_PUT} for ${put_option_value:.2f}")
-
-                action = (
-                    f' [+] DAY: {day} Bought puts at K=${self.parameters.trigger_price_PUT} for ${put_option_value:.2f}, '
-                    f'[PRICE ACTION] Sold puts at ${self.parameters.strike_price_PUT}, bought puts at ${self.parameters.trigger_price_PUT}')
-                print("[+] Price Action: ", action)
-            else:
-                # Update put option value
-                put_price_current = self.black_scholes_put(day_stock, current_put_strike, adjusted_time_to_expiration)
-                put_option_value = self.parameters.num_puts * 100 * put_price_current
-                action = '[!] No need for action today'
-                print("[+]\n Price Action: ", action)
-
-            # Total position value
-            position_value = (self.parameters.num_shares * day_stock) + put_option_value - total_margin_interest
-
-            # Store results
-            position_values.append(position_value)
-            put_strike_prices.append(current_put_strike)
-            put_option_values.append(put_option_value)
-            actions.append(action)
-            margin_interests.append(total_margin_interest)
-
-        # Add results to DataFrame
-        df['Put Strike Price'] = put_strike_prices
-        df['Put Option Value'] = put_option_values
-        df['Margin Interest'] = margin_interests
-        df['Total Position Value'] = position_values
-        df['Action'] = actions[1:]  # Skip the initial action
-        df['Date'] = pd.to_datetime(df['Date']).dt.date
-        df['Value'] = df['Total Position Value'].map('${:,.2f}'.format)
-
-        # Save simulation results
-        try:
-            description = "simulation_results"
-            csv_filename = os.path.join("BLACK_SCHOLES_RESULTS", f"{description}.csv")
-            df.to_csv(csv_filename, index=False)
-
-            excel_filename = os.path.join("BLACK_SCHOLES_RESULTS", f"{description}.xlsx")
-            df.to_excel(excel_filename, index=False, engine='openpyxl')
-            print(f"[!] Data saved to {csv_filename} and {excel_filename}")
-        except Exception as e:
-            print(f"[-] Error saving data: {e}")
-            pass
+    def american_put_lsm(self, put_strike=None, n_paths=100_000, steps=50):
+        """
+        Least-squares Monte Carlo price of an American put over the whole time horizon.
 
-        # Display the final table
-        put_table = PrettyTable()
-        put_table.field_names = df.columns.tolist()
-        for row in df.itertuples(index=False):
-            put_table.add_row(row)
-        print(put_table)
-
-        # Plot total position value over time
-        plt.figure(figsize=(12, 6))
-        plt.plot(df['Date'], df['Total Position Value'], label='Total Position Value')
-        plt.title(f"Investor's Total Position Value Over {self.parameters.time_horizon} Days")
-        plt.xlabel('Date')
-        plt.ylabel('Value ($)')
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
+        Cross-check for the Black-Scholes (European) marks used by the simulation; put_strike
+        defaults to strike_price_PUT. Returns a monte_carlo.MonteCarloEstimate.
+        """
+        put_strike = self.parameters.strike_price_PUT if put_strike is None else put_strike
+        return lsm_american_option(self.parameters.initial_equity_price,
+                                   self.parameters.time_horizon * self.adjusted_time_step,
+                                   self.parameters.risk_free_rate, self.parameters.volatility,
+                                   vanilla_payoff(put_strike, "put"), steps, n_paths, seed=self.seed)
 
-        output_file = 'total_position_value.png'
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        print(f'[!] Graph saved to {output_file}')
-        plt.show()
+    def black_scholes_put(self, equity_price, put_strike, time_to_expiration):
+        """Calculate the price of a put option using the Black-Scholes model (scalars or arrays)."""
+        return black_scholes_put(equity_price, put_strike, time_to_expiration,
+                                 self.parameters.risk_free_rate, self.parameters.volatility)
 
-        # Plot stock price and put strike price over time
-        print("Plotting the stock price and put strike price over time")
-        plt.figure(figsize=(12, 6))
-        plt.plot(df['Date'], df['Stock Price'], label='Stock Price')
-        plt.plot(df['Date'], df['Put Strike Price'], label='Put Strike Price', linestyle='--')
-        plt.title(f'Stock Price and Put Strike Price Over {self.parameters.time_horizon} Days')
-        plt.xlabel('Date')
-        plt.ylabel('Price ($)')
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
+    def run(self, sinks=()):
+        """
+        Simulate one path, value the put roll over it and return the result without any output.
 
-        output_file = 'stock_and_put_strike_price.png'
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        print(f'[!] Graph saved to {output_file}')
-        plt.show()
+        Args:
+            sinks: Callables sink(result) run in order on the result, e.g. the csv_sink(),
+                excel_sink(), print_table, print_trigger_log or plot_sink() of simulation_output.
+        Returns:
+            simulation_output.SimulationResult with the prices, the roll_put_strategy arrays and
+            the per-day table.
+        """
+        prices = self.simulate_stock_prices(rng=np.random.default_rng(self.seed))
+        # Whole horizon at once: put marks, roll day and margin interest as array operations
+        result = build_result(prices, roll_put_strategy(prices, self.parameters), self.parameters)
+        for sink in sinks:
+            sink(result)
+        return result
 
-        return simulated_price_index
+    def run_simulation(self):
+        """Run the simulation with every output (files, trigger log, table and plots); returns the prices."""
+        return self.run(INTERACTIVE_SINKS).prices
 
 
 # Assuming Parameters class is defined elsewhere with a from_user_input() method
@@ -668,7 +609,7 @@ class OptionSimulator:
 if __name__ == "__main__":
     parameters = Parameters.from_user_input()
     simulator = OptionSimulator(parameters)
-    stock_index = simulator.run_simulation
+    stock_index = simulator.run_simulation()
 
 
     print("RUNNING STOCK DATA CLASS")
@@ -0,0 +1,395 @@
+import numpy as np
+from dataclasses import dataclass
+from scipy.special import ndtr, ndtri
+from scipy.stats import qmc
+
+
+''' Multi-path Monte Carlo for OptionSimulator (see main.py).
+
+    Paths use the same GBM discretisation as OptionSimulator.simulate_stock_prices, one row per
+    path. Large runs are streamed in chunks so only chunk_size paths are ever in memory, and
+    estimates are accumulated from running sums. Two variance reductions are available:
+        antithetic      - every normal draw Z is also used as -Z; the pair average is one sample.
+        control variate - the put payoff max(K - S_T, 0) on each path, whose mean is known in
+                          closed form (Black-Scholes with the path's drift and variance), is
+                          regressed out of the quantity being estimated.
+
+    Quasi-Monte Carlo paths come from scrambled Sobol points mapped to normals and laid out by a
+    Brownian bridge: the first Sobol coordinate sets the terminal value, the next ones the
+    midpoints, and so on, so the best-distributed coordinates carry most of the path's
+    variance. Independent scramblings (replicates) give the standard error.
+
+    Randomness never comes from the global np.random state. Streamed runs take a seed (an int or
+    a SeedSequence) and chunk k of the run draws from its own Generator, the k-th child of
+    SeedSequence(seed) as SeedSequence.spawn would make it. Chunks are therefore independent
+    and reproducible whichever worker or order they run in, and any path of a large run can be
+    regenerated by rebuilding only its chunk (regenerate_paths).
+'''
+
+
+@dataclass
+class MonteCarloEstimate:
+    mean: float
+    std_error: float
+    n_paths: int
+    beta: float = 0.0
+
+    @property
+    def confidence_interval(self):
+        """95% normal confidence interval for the mean."""
+        return self.mean - 1.96 * self.std_error, self.mean + 1.96 * self.std_error
+
+
+def _time_grid(parameters):
+    dt = 1 / parameters.time_step
+    return np.linspace(0, parameters.time_horizon * dt, parameters.time_horizon_step), dt
+
+
+def gbm_paths_from_normals(parameters, normals):
+    """Turn standard normals of shape (paths, steps) into GBM price paths of the same shape."""
+    t, dt = _time_grid(parameters)
+    randomness = np.cumsum(normals, axis=-1) * np.sqrt(dt)
+    coeff = (parameters.annual_expected_return - 0.5 * parameters.volatility ** 2) * t \
+            + parameters.volatility * randomness
+    return parameters.initial_equity_price * np.exp(coeff)
+
+
+def _root_seed(seed):
+    """A SeedSequence for seed, with fresh OS entropy when seed is None."""
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def chunk_rng(seed, chunk):
+    """Generator of chunk number chunk of a run seeded with seed: child chunk of SeedSequence(seed).spawn()."""
+    root = _root_seed(seed)
+    child = np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (chunk,), pool_size=root.pool_size)
+    return np.random.default_rng(child)
+
+
+def _chunk_size(chunk_size, antithetic):
+    return max(2, chunk_size - chunk_size % 2) if antithetic else max(1, chunk_size)
+
+
+def _draw_normals(n_paths, steps, antithetic, rng):
+    if antithetic:
+        if n_paths % 2:
+            raise ValueError("antithetic sampling needs an even number of paths")
+        half = rng.standard_normal(size=(n_paths // 2, steps))
+        return np.concatenate([half, -half])
+    return rng.standard_normal(size=(n_paths, steps))
+
+
+def simulate_gbm_paths(parameters, n_paths, antithetic=False, rng=None):
+    """
+    Simulate n_paths GBM price paths.
+
+    Args:
+        parameters: Parameters instance (see main.py).
+        n_paths: Number of paths (even if antithetic).
+        antithetic: If True, the second half of the paths mirror the first half's draws.
+        rng: numpy.random.Generator to draw from; a freshly seeded one if None.
+    Returns:
+        Array of shape (n_paths, time_horizon_step).
+    """
+    normals = _draw_normals(n_paths, parameters.time_horizon_step, antithetic, rng or np.random.default_rng())
+    return gbm_paths_from_normals(parameters, normals)
+
+
+def _simulator(model):
+    """simulate(parameters, n_paths, antithetic, rng) of a path model (see path_models.py); GBM if None."""
+    return simulate_gbm_paths if model is None else model.simulate
+
+
+def iter_gbm_paths(parameters, n_paths, chunk_size=10_000, antithetic=False, seed=None, model=None):
+    """
+    Yield n_paths GBM paths in chunks of at most chunk_size rows, as simulate_gbm_paths.
+
+    Chunk k is drawn from chunk_rng(seed, k); the same seed, n_paths and chunk_size always
+    give the same paths. With model set (a path_models object), its paths are streamed instead.
+    """
+    simulate = _simulator(model)
+    root = _root_seed(seed)
+    chunk_size = _chunk_size(chunk_size, antithetic)
+    for chunk, start in enumerate(range(0, n_paths, chunk_size)):
+        yield simulate(parameters, min(chunk_size, n_paths - start), antithetic, chunk_rng(root, chunk))
+
+
+def regenerate_paths(parameters, indices, n_paths, seed, chunk_size=10_000, antithetic=False, model=None):
+    """
+    Rebuild selected paths of an iter_gbm_paths run without generating the rest of it.
+
+    Only the chunks containing the requested paths are drawn again.
+
+    Args:
+        indices: Path numbers within the run (0 .. n_paths - 1).
+        n_paths, seed, chunk_size, antithetic, model: As passed to iter_gbm_paths for the run.
+    Returns:
+        Array of shape (len(indices), time_horizon_step).
+    """
+    indices = np.atleast_1d(indices)
+    chunk_size = _chunk_size(chunk_size, antithetic)
+    root = _root_seed(seed)
+    simulate = _simulator(model)
+    paths = np.empty((indices.size, parameters.time_horizon_step))
+    for chunk in np.unique(indices // chunk_size):
+        start = chunk * chunk_size
+        block = simulate(parameters, min(chunk_size, n_paths - start), antithetic, chunk_rng(root, chunk))
+        rows = np.flatnonzero(indices // chunk_size == chunk)
+        paths[rows] = block[indices[rows] - start]
+    return paths
+
+
+def terminal_put_mean(parameters, strike):
+    """
+    Closed-form E[max(K - S_T, 0)] at the last step of the simulated paths.
+
+    ln S_T is normal with the drift of the last grid time and the variance of
+    time_horizon_step increments, so this is the undiscounted Black-Scholes put
+    on that lognormal.
+    """
+    t, dt = _time_grid(parameters)
+    sigma = parameters.volatility
+    mean_log = np.log(parameters.initial_equity_price) + (parameters.annual_expected_return - 0.5 * sigma ** 2) * t[-1]
+    std_log = sigma * np.sqrt(parameters.time_horizon_step * dt)
+    d2 = (mean_log - np.log(strike)) / std_log
+    forward = np.exp(mean_log + 0.5 * std_log ** 2)
+    return strike * ndtr(-d2) - forward * ndtr(-d2 - std_log)
+
+
+class _RunningMoments:
+    """
+    Running count, means and co-moment matrix of several quantities over samples, merged chunk
+    by chunk (Chan et al.) so large values do not lose precision.
+    """
+
+    def __init__(self, dimension):
+        self.n, self.mean, self.comoment = 0, np.zeros(dimension), np.zeros((dimension, dimension))
+
+    def update(self, samples, antithetic=False):
+        """Add a (quantities, paths) chunk; with antithetic, each mirrored pair is averaged into one sample."""
+        if antithetic:
+            half = samples.shape[1] // 2
+            samples = 0.5 * (samples[:, :half] + samples[:, half:])
+        m = samples.shape[1]
+        chunk_mean = samples.mean(axis=1)
+        centred = samples - chunk_mean[:, None]
+        delta = chunk_mean - self.mean
+        self.comoment += centred @ centred.T + np.outer(delta, delta) * self.n * m / (self.n + m)
+        self.mean += delta * m / (self.n + m)
+        self.n += m
+
+    @property
+    def covariance(self):
+        return self.comoment / (self.n - 1)
+
+    def estimate(self, i, n_paths):
+        """MonteCarloEstimate of the mean of quantity i."""
+        return MonteCarloEstimate(float(self.mean[i]), float(np.sqrt(self.covariance[i, i] / self.n)), n_paths)
+
+
+def monte_carlo_estimate(parameters, payoff, n_paths, chunk_size=10_000, antithetic=False, control_variate=False,
+                         control_strike=None, seed=None, model=None):
+    """
+    Estimate E[payoff(paths)] from n_paths streamed GBM paths.
+
+    Args:
+        parameters: Parameters instance (see main.py).
+        payoff: Callable taking a (paths, steps) chunk and returning one value per path, e.g. the
+            final position value from put_strategy.roll_put_strategy.
+        n_paths: Total number of paths.
+        chunk_size: Paths generated and held in memory at a time.
+        antithetic: Use antithetic pairs.
+        control_variate: Regress out the terminal put payoff, whose mean is known exactly.
+        control_strike: Strike of the control put; defaults to parameters.strike_price_PUT.
+        seed: Seed of the path streams (int or SeedSequence), as for iter_gbm_paths.
+        model: Optional path model (see path_models.py); the control variate then needs its
+            terminal_put_mean (ValueError otherwise).
+    Returns:
+        MonteCarloEstimate with the mean, its standard error, the path count and the
+        control variate coefficient (0 without control variate).
+    """
+    strike = parameters.strike_price_PUT if control_strike is None else control_strike
+    if control_variate and model is not None and not hasattr(model, "terminal_put_mean"):
+        raise ValueError(f"{type(model).__name__} has no terminal_put_mean, so it cannot provide the control "
+                         f"variate; use control_variate=False")
+    moments = _RunningMoments(2)
+    for paths in iter_gbm_paths(parameters, n_paths, chunk_size, antithetic, seed, model):
+        y = np.asarray(payoff(paths), dtype=float)
+        x = np.maximum(strike - paths[:, -1], 0) if control_variate else np.zeros_like(y)
+        moments.update(np.stack([y, x]), antithetic)
+
+    n, mean = moments.n, moments.mean
+    (var_y, cov_xy), (_, var_x) = moments.covariance
+    beta = cov_xy / var_x if control_variate and var_x > 0 else 0.0
+    control_mean = (terminal_put_mean if model is None else model.terminal_put_mean)(parameters, strike) \
+        if control_variate else 0.0
+    estimate = mean[0] - beta * (mean[1] - control_mean)
+    variance = max(var_y - beta * cov_xy, 0.0)
+    return MonteCarloEstimate(float(estimate), float(np.sqrt(variance / n)), n_paths, float(beta))
+
+
+@dataclass
+class MonteCarloGreeks:
+    price: MonteCarloEstimate
+    delta: MonteCarloEstimate
+    vega: MonteCarloEstimate
+    gamma: MonteCarloEstimate
+
+
+def terminal_put_gradient(strike):
+    """Derivative of the payoff max(K - S_T, 0) with respect to every price of the path, for monte_carlo_greeks."""
+    def gradient(paths):
+        grad = np.zeros_like(paths)
+        grad[:, -1] = np.where(paths[:, -1] < strike, -1.0, 0.0)
+        return grad
+    return gradient
+
+
+def monte_carlo_greeks(parameters, payoff, payoff_gradient, n_paths, chunk_size=10_000, antithetic=False, seed=None,
+                       gamma_step=0):
+    """
+    Estimate E[payoff(paths)] and its delta, vega and gamma from one set of GBM paths.
+
+    Every Greek reuses the draws of the price, so the full set costs one simulation instead of
+    two bumped revaluations per Greek:
+        delta - pathwise: sum over steps of dpayoff/dS_k * S_k / S_0.
+        vega  - pathwise: sum over steps of dpayoff/dS_k * S_k * (W_k - sigma t_k), W being the
+                path's Brownian motion.
+        gamma - likelihood ratio on the pathwise delta: with D = sum of dpayoff/dS_k * S_k,
+                gamma = E[D / S_0^2 * (Z / s - 1)], where ln S_j ~ N(ln S_0 + m, s^2) and
+                Z = (ln S_j - ln S_0 - m) / s for the column j = gamma_step. This works for kinked
+                payoffs, whose pathwise second derivative vanishes, and has far less variance
+                than the pure likelihood-ratio weight. Its noise falls as the column moves later,
+                so gamma_step should be the first column the payoff depends on (-1 for payoffs
+                on the last price only).
+    Greeks are with respect to initial_equity_price and volatility, of the undiscounted mean
+    under annual_expected_return, as monte_carlo_estimate computes it. A payoff that also uses
+    the volatility directly (e.g. Black-Scholes marks) only gets the part of vega that comes
+    through the paths.
+
+    Args:
+        parameters: Parameters instance (see main.py).
+        payoff: As for monte_carlo_estimate.
+        payoff_gradient: Callable taking the same chunk and returning dpayoff/dS for every
+            price, shaped like it (e.g. terminal_put_gradient(K)).
+        n_paths, chunk_size, antithetic, seed: As for iter_gbm_paths; the paths are the same.
+        gamma_step: Column of the paths the gamma score is taken at; the payoff must not depend on
+            earlier columns.
+    Returns:
+        MonteCarloGreeks of MonteCarloEstimates (mean and standard error) for price, delta, vega and gamma.
+    """
+    t, dt = _time_grid(parameters)
+    S0, sigma = parameters.initial_equity_price, parameters.volatility
+    gamma_step = gamma_step % parameters.time_horizon_step
+    score_std = sigma * np.sqrt((gamma_step + 1) * dt)
+    root = _root_seed(seed)
+    chunk_size = _chunk_size(chunk_size, antithetic)
+
+    moments = _RunningMoments(4)
+    for chunk, start in enumerate(range(0, n_paths, chunk_size)):
+        # Same draws as iter_gbm_paths, kept to differentiate the paths with respect to sigma
+        normals = _draw_normals(min(chunk_size, n_paths - start), parameters.time_horizon_step, antithetic,
+                                chunk_rng(root, chunk))
+        paths = gbm_paths_from_normals(parameters, normals)
+        y = np.asarray(payoff(paths), dtype=float)
+        weighted = np.asarray(payoff_gradient(paths), dtype=float) * paths
+
+        brownian = np.cumsum(normals, axis=1) * np.sqrt(dt)
+        delta = weighted.sum(axis=1) / S0
+        vega = np.sum(weighted * (brownian - sigma * t), axis=1)
+        gamma = weighted.sum(axis=1) / S0 ** 2 * (sigma * brownian[:, gamma_step] / score_std ** 2 - 1)
+        moments.update(np.stack([y, delta, vega, gamma]), antithetic)
+
+    return MonteCarloGreeks(*(moments.estimate(i, n_paths) for i in range(4)))
+
+
+def _brownian_bridge_schedule(steps):
+    """
+    Construction order of a Brownian bridge on grid points 1..steps (W_0 = 0).
+
+    Returns arrays (point, left, right, left_weight, right_weight, std), one entry per
+    coordinate: W[point] = left_weight * W[left] + right_weight * W[right] + std * z.
+    """
+    point, left, right = [steps], [0], [0]
+    left_weight, right_weight, std = [0.0], [0.0], [np.sqrt(steps)]
+    intervals = [(0, steps)]
+    while intervals:
+        next_intervals = []
+        for lo, hi in intervals:
+            if hi - lo < 2:
+                continue
+            mid = (lo + hi) // 2
+            point.append(mid)
+            left.append(lo)
+            right.append(hi)
+            left_weight.append((hi - mid) / (hi - lo))
+            right_weight.append((mid - lo) / (hi - lo))
+            std.append(np.sqrt((mid - lo) * (hi - mid) / (hi - lo)))
+            next_intervals += [(lo, mid), (mid, hi)]
+        intervals = next_intervals
+    return tuple(np.array(x) for x in (point, left, right, left_weight, right_weight, std))
+
+
+def brownian_bridge_normals(gaussians):
+    """
+    Map independent normals of shape (paths, steps) to the normal increments of a Brownian
+    bridge path, ordered so that column 0 drives the terminal value.
+
+    The output has the same distribution as the input (iid standard normals), so it can be
+    fed to gbm_paths_from_normals.
+    """
+    paths, steps = gaussians.shape
+    point, left, right, left_weight, right_weight, std = _brownian_bridge_schedule(steps)
+    W = np.zeros((paths, steps + 1))
+    for k in range(steps):
+        W[:, point[k]] = left_weight[k] * W[:, left[k]] + right_weight[k] * W[:, right[k]] + std[k] * gaussians[:, k]
+    return np.diff(W, axis=1)
+
+
+def iter_sobol_paths(parameters, n_paths, chunk_size=8192, seed=None):
+    """
+    Yield n_paths scrambled-Sobol GBM paths in chunks, with Brownian-bridge construction.
+
+    n_paths and chunk_size should be powers of two to keep the Sobol balance properties.
+    seed is the scrambling seed (int, SeedSequence or Generator); None scrambles with fresh entropy.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        seed = np.random.default_rng(seed)
+    sampler = qmc.Sobol(parameters.time_horizon_step, scramble=True, seed=seed)
+    for start in range(0, n_paths, chunk_size):
+        uniforms = sampler.random(min(chunk_size, n_paths - start))
+        # Keep the inverse normal finite at the (measure zero) cube faces
+        gaussians = ndtri(np.clip(uniforms, 1e-12, 1 - 1e-12))
+        yield gbm_paths_from_normals(parameters, brownian_bridge_normals(gaussians))
+
+
+def simulate_sobol_paths(parameters, n_paths, seed=None):
+    """All n_paths of iter_sobol_paths in one (n_paths x time_horizon_step) array."""
+    return np.concatenate(list(iter_sobol_paths(parameters, n_paths, n_paths, seed)))
+
+
+def qmc_estimate(parameters, payoff, n_paths, replicates=16, chunk_size=8192, seed=None):
+    """
+    Randomized quasi-Monte Carlo estimate of E[payoff(paths)].
+
+    Args:
+        parameters: Parameters instance (see main.py).
+        payoff: As for monte_carlo_estimate.
+        n_paths: Sobol points per replicate (a power of two).
+        replicates: Independent scramblings; their spread gives the standard error.
+        chunk_size: Paths generated and held in memory at a time.
+        seed: Seed (int or SeedSequence) whose spawned children scramble the replicates.
+    Returns:
+        MonteCarloEstimate of the mean over all replicates, with the standard error of the
+        replicate means, and n_paths * replicates paths.
+    """
+    replicate_means = []
+    for replicate_seed in _root_seed(seed).spawn(replicates):
+        total = 0.0
+        for paths in iter_sobol_paths(parameters, n_paths, chunk_size, replicate_seed):
+            total += np.sum(payoff(paths))
+        replicate_means.append(total / n_paths)
+
+    replicate_means = np.array(replicate_means)
+    std_error = replicate_means.std(ddof=1) / np.sqrt(replicates) if replicates > 1 else np.nan
+    return MonteCarloEstimate(float(replicate_means.mean()), float(std_error), n_paths * replicates)
@@ -0,0 +1,132 @@
+import os
+import hashlib
+import itertools
+import dataclasses
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from monte_carlo import iter_gbm_paths
+from path_models import GBMModel
+from put_strategy import evaluate_put_roll
+
+
+''' Parameter sweeps of the protective put roll across a process pool.
+
+    Every scenario is the base Parameters with some fields replaced. Scenarios are sent to the
+    workers as plain dicts (dataclasses.asdict), so workers only import this module and the
+    numpy kernels, not main.py. Each scenario is backtested over the same seeded set of paths
+    (common random numbers), so differences between scenarios are not sampling noise.
+
+    With a checkpoint file, each finished scenario's summary row is appended to a CSV as soon
+    as it arrives; rerunning the same sweep with the same checkpoint skips the scenarios
+    already in it, so a killed sweep resumes where it stopped. Rows are matched to scenarios by
+    their Parameters fields and run settings (n_paths, seed, chunk_size, antithetic, model), never by
+    position, and a checkpoint holding rows of another sweep is refused.
+'''
+
+
+def parameter_grid(**ranges):
+    """
+    Every combination of the given field values.
+
+    Example: parameter_grid(trigger_price=[105, 110, 115], num_puts=[5, 10]) gives 6 dicts.
+    """
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(ranges[name] for name in names))]
+
+
+def _scenario_key(fields, settings):
+    """What identifies a scenario's result: its Parameters fields and the run settings."""
+    return tuple(fields.values()) + tuple(settings.values())
+
+
+def _model_key(model):
+    """
+    Class name and SHA-256 of the model's parameters, exact even for array fields (e.g. a
+    LocalVolModel surface) whose repr NumPy would truncate.
+    """
+    digest = hashlib.sha256(type(model).__name__.encode())
+    values = (getattr(model, field.name) for field in dataclasses.fields(model)) \
+        if dataclasses.is_dataclass(model) else vars(model).values()
+    for value in values:
+        if isinstance(value, np.ndarray):
+            digest.update(f"{value.dtype.str}{value.shape}".encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return f"{type(model).__name__}:{digest.hexdigest()}"
+
+
+def _run_scenario(scenario, fields, settings, model):
+    """Worker: backtest one scenario and return its summary row."""
+    parameters = SimpleNamespace(**fields)
+    paths = iter_gbm_paths(parameters, settings["n_paths"], settings["chunk_size"], settings["antithetic"],
+                           settings["seed"], model)
+    stats = evaluate_put_roll(paths, parameters).summary(percentiles=(5, 50, 95))
+
+    # Fixed columns, so rows appended to the checkpoint line up even when nothing rolled
+    row = {"scenario": scenario, **fields, **settings}
+    for name in ("final_value", "max_drawdown", "roll_day"):
+        for stat in ("mean", "std", "p5", "p50", "p95"):
+            row[f"{name}_{stat}"] = stats[name][stat] if stats[name] else np.nan
+    row["roll_probability"] = stats["roll_probability"]
+    return row
+
+
+def sweep_put_roll(base_parameters, grid, n_paths=10_000, seed=42, workers=None, checkpoint=None, chunk_size=10_000,
+                   antithetic=False, model=None):
+    """
+    Backtest the put roll for every scenario of a parameter grid.
+
+    Args:
+        base_parameters: Parameters instance the scenarios start from.
+        grid: List of dicts of field overrides, e.g. from parameter_grid().
+        n_paths: Simulated paths per scenario.
+        seed: Seed of the path streams (see monte_carlo.iter_gbm_paths), shared by all scenarios;
+            an int when checkpointing, so a resumed sweep draws the same paths.
+        workers: Worker processes; defaults to os.cpu_count().
+        checkpoint: Optional CSV path that finished scenarios are appended to and resumed from.
+            Raises ValueError if it holds rows that are not scenarios of this sweep with these
+            settings.
+        chunk_size: Paths simulated and valued at a time in each worker.
+        antithetic: Use antithetic paths.
+        model: Path model of every scenario (see path_models.py); GBM if None. It is sent to the
+            workers, so it must pickle (the path_models dataclasses do).
+    Returns:
+        DataFrame with one row per scenario, in grid order: the scenario index, its Parameters
+        fields, the run settings and the mean, std, 5th/50th/95th percentiles of final Total Position Value, max
+        drawdown and roll day, and the roll probability.
+    """
+    scenarios = [dataclasses.asdict(dataclasses.replace(base_parameters, **overrides)) for overrides in grid]
+    model = model or GBMModel()
+    settings = {"n_paths": n_paths, "seed": seed, "chunk_size": chunk_size, "antithetic": antithetic,
+                "model": _model_key(model)}
+
+    rows = []
+    if checkpoint and not isinstance(seed, (int, np.integer)):
+        raise ValueError("checkpointed sweeps need an int seed, so resumed scenarios draw the same paths")
+    if checkpoint and os.path.exists(checkpoint):
+        index = {_scenario_key(fields, settings): i for i, fields in enumerate(scenarios)}
+        for row in pd.read_csv(checkpoint).to_dict("records"):
+            key = _scenario_key({name: row.get(name) for name in scenarios[0]},
+                                {name: row.get(name) for name in settings})
+            if key not in index:
+                raise ValueError(f"checkpoint {checkpoint} has a row (scenario {row['scenario']}) that is not a "
+                                 f"scenario of this sweep with these settings; use another checkpoint file")
+            rows.append({**row, "scenario": index[key]})
+    done = {row["scenario"] for row in rows}
+    pending = [i for i in range(len(scenarios)) if i not in done]
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = [pool.submit(_run_scenario, i, scenarios[i], settings, model) for i in pending]
+            for future in as_completed(futures):
+                row = future.result()
+                rows.append(row)
+                if checkpoint:
+                    pd.DataFrame([row]).to_csv(checkpoint, mode="a", index=False,
+                                               header=not os.path.exists(checkpoint))
+
+    return pd.DataFrame(rows).sort_values("scenario").reset_index(drop=True)
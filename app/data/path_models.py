@@ -0,0 +1,402 @@
+import copy
+import time
+import numpy as np
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from scipy.integrate import quad
+from scipy.stats import poisson
+
+from monte_carlo import gbm_paths_from_normals, terminal_put_mean
+from put_strategy import black_scholes_put
+
+
+''' Pluggable stock path models for OptionSimulator.
+
+    A model is an object with
+        simulate(parameters, n_paths, antithetic, rng) -> (n_paths, time_horizon_step) prices
+    and optionally
+        terminal_put_mean(parameters, strike) -> exact E[max(K - S_T, 0)] at the last step,
+    which the control variate and the benchmark use. Spot, drift, horizon and time grid always
+    come from Parameters; the model object carries only its own dynamics.
+
+        GBMModel        - constant volatility, exactly the simulator's original paths.
+        HestonModel     - stochastic variance with Andersen's quadratic-exponential (QE) scheme.
+        LocalVolModel   - volatility looked up on a (time, spot) surface at every step.
+        MertonJumpModel - GBM plus compound-Poisson jumps with normal log sizes.
+        KouJumpModel    - GBM plus compound-Poisson jumps with double-exponential log sizes.
+
+    The jump models compensate the drift so E[S_t] still grows at annual_expected_return.
+
+    Heston, local-vol and jump paths live on the grid t_k = (k + 1) / time_step, k = 0 .. steps - 1.
+    All random numbers for all paths and steps are drawn up front; the only loop is over time
+    steps for the state recursion, each step being one array operation across all paths.
+'''
+
+
+def _random(rng, shape, antithetic, uniform=False):
+    """Normals (or uniforms) of the given shape; with antithetic, the second half mirrors the first."""
+    if not antithetic:
+        return rng.random(size=shape) if uniform else rng.standard_normal(size=shape)
+    if shape[0] % 2:
+        raise ValueError("antithetic sampling needs an even number of paths")
+    half = (shape[0] // 2,) + shape[1:]
+    draws = rng.random(size=half) if uniform else rng.standard_normal(size=half)
+    return np.concatenate([draws, 1 - draws if uniform else -draws])
+
+
+def _fourier_put_mean(characteristic_function, forward, strike):
+    """
+    E[max(K - S_T, 0)] from the characteristic function of ln S_T (Gil-Pelaez inversion);
+    forward is E[S_T].
+    """
+    phi, log_strike = characteristic_function, np.log(strike)
+    share = quad(lambda u: (np.exp(-1j * u * log_strike) * phi(u - 1j) / (1j * u * forward)).real, 0, np.inf,
+                 limit=200)[0]
+    cash = quad(lambda u: (np.exp(-1j * u * log_strike) * phi(u) / (1j * u)).real, 0, np.inf, limit=200)[0]
+    call = forward * (0.5 + share / np.pi) - strike * (0.5 + cash / np.pi)
+    return call - forward + strike
+
+
+@dataclass
+class GBMModel:
+    """Geometric Brownian motion with Parameters.volatility (the simulator's default)."""
+
+    def simulate(self, parameters, n_paths, antithetic=False, rng=None):
+        rng = rng or np.random.default_rng()
+        return gbm_paths_from_normals(parameters, _random(rng, (n_paths, parameters.time_horizon_step), antithetic))
+
+    def terminal_put_mean(self, parameters, strike):
+        return terminal_put_mean(parameters, strike)
+
+
+@dataclass
+class HestonModel:
+    """
+    Heston stochastic variance, dv = kappa (theta - v) dt + xi sqrt(v) dW_v, corr(dW_v, dW_S) = rho.
+
+    Parameters.volatility is not used; the initial variance is v0.
+    """
+    v0: float = 0.04
+    kappa: float = 2.0
+    theta: float = 0.04
+    xi: float = 0.5
+    rho: float = -0.7
+    psi_switch: float = 1.5
+
+    def simulate(self, parameters, n_paths, antithetic=False, rng=None, return_variance=False):
+        rng = rng or np.random.default_rng()
+        steps = parameters.time_horizon_step
+        dt = 1 / parameters.time_step
+        kappa, theta, xi, rho = self.kappa, self.theta, self.xi, self.rho
+
+        z_variance = _random(rng, (n_paths, steps), antithetic)
+        u_variance = _random(rng, (n_paths, steps), antithetic, uniform=True)
+        z_price = _random(rng, (n_paths, steps), antithetic)
+
+        # QE variance recursion (Andersen 2008): moment-matched quadratic-normal for psi <= psi_switch,
+        # point mass at zero plus exponential tail above it
+        decay = np.exp(-kappa * dt)
+        c1 = xi ** 2 * decay * (1 - decay) / kappa
+        c2 = theta * xi ** 2 * (1 - decay) ** 2 / (2 * kappa)
+        variance = np.empty((n_paths, steps + 1))
+        variance[:, 0] = self.v0
+        for k in range(steps):
+            v = variance[:, k]
+            m = theta + (v - theta) * decay
+            psi = (v * c1 + c2) / m ** 2
+
+            quadratic = psi <= self.psi_switch
+            inv_psi = 2 / np.where(quadratic, psi, 1.0)
+            b2 = np.maximum(inv_psi - 1 + np.sqrt(inv_psi * np.maximum(inv_psi - 1, 0)), 0)
+            v_quadratic = m / (1 + b2) * (np.sqrt(b2) + z_variance[:, k]) ** 2
+
+            p = (psi - 1) / (psi + 1)
+            beta = (1 - p) / m
+            u = u_variance[:, k]
+            v_exponential = np.where(u <= p, 0.0, np.log(np.maximum((1 - p) / np.maximum(1 - u, 1e-300), 1)) / beta)
+
+            variance[:, k + 1] = np.where(quadratic, v_quadratic, v_exponential)
+
+        # Log price from the variance path, all steps at once (central discretisation of the integral)
+        v, v_next = variance[:, :-1], variance[:, 1:]
+        k0 = -rho * kappa * theta * dt / xi
+        k1 = 0.5 * dt * (kappa * rho / xi - 0.5) - rho / xi
+        k2 = 0.5 * dt * (kappa * rho / xi - 0.5) + rho / xi
+        k3 = 0.5 * dt * (1 - rho ** 2)
+        increments = parameters.annual_expected_return * dt + k0 + k1 * v + k2 * v_next \
+                     + np.sqrt(k3 * (v + v_next)) * z_price
+        paths = parameters.initial_equity_price * np.exp(np.cumsum(increments, axis=1))
+        return (paths, variance[:, 1:]) if return_variance else paths
+
+    def _characteristic_function(self, u, log_spot, drift, T):
+        """E[exp(i u ln S_T)] in the numerically stable ("little trap") form."""
+        kappa, theta, xi, rho, v0 = self.kappa, self.theta, self.xi, self.rho, self.v0
+        beta = kappa - rho * xi * 1j * u
+        d = np.sqrt(beta ** 2 + xi ** 2 * (1j * u + u ** 2))
+        g = (beta - d) / (beta + d)
+        e = np.exp(-d * T)
+        C = kappa * theta / xi ** 2 * ((beta - d) * T - 2 * np.log((1 - g * e) / (1 - g)))
+        D = (beta - d) / xi ** 2 * (1 - e) / (1 - g * e)
+        return np.exp(1j * u * (log_spot + drift * T) + C + D * v0)
+
+    def terminal_put_mean(self, parameters, strike):
+        """Semi-closed-form E[max(K - S_T, 0)] at the last grid time, by Fourier inversion."""
+        T = parameters.time_horizon_step / parameters.time_step
+        log_spot, drift = np.log(parameters.initial_equity_price), parameters.annual_expected_return
+        return _fourier_put_mean(lambda u: self._characteristic_function(u, log_spot, drift, T),
+                                 parameters.initial_equity_price * np.exp(drift * T), strike)
+
+
+@dataclass
+class LocalVolModel:
+    """
+    Local volatility sigma(t, S), bilinear in (time, log spot) on a grid and flat beyond its edges.
+
+    Args:
+        times: Increasing grid times (years).
+        spots: Increasing grid spot levels.
+        vols: Volatility surface of shape (len(times), len(spots)).
+    """
+    times: np.ndarray
+    spots: np.ndarray
+    vols: np.ndarray
+
+    @classmethod
+    def from_function(cls, sigma, times, spots):
+        """Tabulate a function sigma(t, S) (vectorized) on the given grid."""
+        times, spots = np.asarray(times, dtype=float), np.asarray(spots, dtype=float)
+        return cls(times, spots, sigma(times[:, None], spots[None, :]))
+
+    def volatility(self, t, spot):
+        """Interpolated local vol at scalar time t for an array of spots."""
+        i = np.clip(np.searchsorted(self.times, t) - 1, 0, len(self.times) - 2)
+        wt = np.clip((t - self.times[i]) / (self.times[i + 1] - self.times[i]), 0, 1)
+        row = (1 - wt) * self.vols[i] + wt * self.vols[i + 1]
+
+        log_grid = np.log(self.spots)
+        x = np.clip(np.log(spot), log_grid[0], log_grid[-1])
+        j = np.clip(np.searchsorted(log_grid, x) - 1, 0, len(log_grid) - 2)
+        ws = (x - log_grid[j]) / (log_grid[j + 1] - log_grid[j])
+        return (1 - ws) * row[j] + ws * row[j + 1]
+
+    def simulate(self, parameters, n_paths, antithetic=False, rng=None):
+        rng = rng or np.random.default_rng()
+        steps = parameters.time_horizon_step
+        dt = 1 / parameters.time_step
+        normals = _random(rng, (n_paths, steps), antithetic) * np.sqrt(dt)
+
+        # Log-Euler with the vol frozen over each step at its starting (time, spot)
+        paths = np.empty((n_paths, steps))
+        spot = np.full(n_paths, float(parameters.initial_equity_price))
+        for k in range(steps):
+            sigma = self.volatility(k * dt, spot)
+            spot = spot * np.exp((parameters.annual_expected_return - 0.5 * sigma ** 2) * dt + sigma * normals[:, k])
+            paths[:, k] = spot
+        return paths
+
+
+class _JumpDiffusion(ABC):
+    """Shared path construction of the jump models; subclasses supply the jump sizes."""
+
+    @property
+    @abstractmethod
+    def mean_jump(self):
+        """E[exp(Y)] - 1 for one jump of log size Y."""
+
+    @abstractmethod
+    def _jump_sums(self, counts, rng, antithetic):
+        """Sum of counts[i, k] jump log sizes per path and step."""
+
+    @abstractmethod
+    def _jump_characteristic_function(self, u):
+        """E[exp(i u Y)] for one jump of log size Y."""
+
+    def simulate(self, parameters, n_paths, antithetic=False, rng=None):
+        rng = rng or np.random.default_rng()
+        steps = parameters.time_horizon_step
+        dt = 1 / parameters.time_step
+        sigma = parameters.volatility
+
+        # Jump counts for every path and step at once; antithetic pairs share them
+        counts = rng.poisson(self.intensity * dt, size=(n_paths // 2 if antithetic else n_paths, steps))
+        if antithetic:
+            counts = np.concatenate([counts, counts])
+        jumps = self._jump_sums(counts, rng, antithetic)
+
+        drift = parameters.annual_expected_return - 0.5 * sigma ** 2 - self.intensity * self.mean_jump
+        increments = drift * dt + sigma * np.sqrt(dt) * _random(rng, (n_paths, steps), antithetic) + jumps
+        return parameters.initial_equity_price * np.exp(np.cumsum(increments, axis=1))
+
+    def _characteristic_function(self, u, log_spot, drift, sigma, T):
+        compensated = drift - 0.5 * sigma ** 2 - self.intensity * self.mean_jump
+        return np.exp(1j * u * (log_spot + compensated * T) - 0.5 * sigma ** 2 * u ** 2 * T
+                      + self.intensity * T * (self._jump_characteristic_function(u) - 1))
+
+    def terminal_put_mean(self, parameters, strike):
+        """Semi-closed-form E[max(K - S_T, 0)] at the last grid time, by Fourier inversion."""
+        T = parameters.time_horizon_step / parameters.time_step
+        log_spot, drift = np.log(parameters.initial_equity_price), parameters.annual_expected_return
+        return _fourier_put_mean(
+            lambda u: self._characteristic_function(u, log_spot, drift, parameters.volatility, T),
+            parameters.initial_equity_price * np.exp(drift * T), strike)
+
+
+@dataclass
+class MertonJumpModel(_JumpDiffusion):
+    """
+    Merton jump diffusion: jumps arrive at rate intensity per year with log size N(jump_mean, jump_std ** 2).
+
+    The sum of n normal jumps is N(n * jump_mean, n * jump_std ** 2), so each step's jumps are one
+    normal draw scaled by its count.
+    """
+    intensity: float = 0.5
+    jump_mean: float = -0.1
+    jump_std: float = 0.15
+
+    @property
+    def mean_jump(self):
+        """E[exp(Y)] - 1 for one jump of log size Y."""
+        return np.exp(self.jump_mean + 0.5 * self.jump_std ** 2) - 1
+
+    def terminal_put_mean(self, parameters, strike):
+        """E[max(K - S_T, 0)] at the last grid time, from the Merton series (see merton_put)."""
+        T = parameters.time_horizon_step / parameters.time_step
+        drift = parameters.annual_expected_return
+        return float(np.exp(drift * T) * merton_put(parameters.initial_equity_price, strike, T, drift,
+                                                    parameters.volatility, self.intensity, self.jump_mean,
+                                                    self.jump_std))
+
+    def _jump_sums(self, counts, rng, antithetic):
+        normals = _random(rng, counts.shape, antithetic)
+        return counts * self.jump_mean + np.sqrt(counts) * self.jump_std * normals
+
+    def _jump_characteristic_function(self, u):
+        return np.exp(1j * u * self.jump_mean - 0.5 * self.jump_std ** 2 * u ** 2)
+
+
+@dataclass
+class KouJumpModel(_JumpDiffusion):
+    """
+    Kou double-exponential jump diffusion: jumps arrive at rate intensity per year; a jump is up
+    with probability up_probability, with log size Exp(up_rate), otherwise down with size Exp(down_rate).
+
+    All jumps of all paths are drawn as one flat array and summed into their (path, step) cells
+    with np.bincount, so there is no loop over jumps.
+    """
+    intensity: float = 0.5
+    up_probability: float = 0.3
+    up_rate: float = 20.0
+    down_rate: float = 10.0
+
+    @property
+    def mean_jump(self):
+        """E[exp(Y)] - 1 for one jump of log size Y (needs up_rate > 1)."""
+        p, eta1, eta2 = self.up_probability, self.up_rate, self.down_rate
+        return p * eta1 / (eta1 - 1) + (1 - p) * eta2 / (eta2 + 1) - 1
+
+    def _jump_sums(self, counts, rng, antithetic):
+        # Antithetic pairs share their jumps (as they share their counts)
+        distinct = counts[:len(counts) // 2] if antithetic else counts
+        total = int(distinct.sum())
+        up = rng.random(total) < self.up_probability
+        sizes = np.where(up, rng.exponential(1 / self.up_rate, total), -rng.exponential(1 / self.down_rate, total))
+        cells = np.repeat(np.arange(distinct.size), distinct.ravel())
+        sums = np.bincount(cells, weights=sizes, minlength=distinct.size).reshape(distinct.shape)
+        return np.concatenate([sums, sums]) if antithetic else sums
+
+    def _jump_characteristic_function(self, u):
+        p, eta1, eta2 = self.up_probability, self.up_rate, self.down_rate
+        return p * eta1 / (eta1 - 1j * u) + (1 - p) * eta2 / (eta2 + 1j * u)
+
+
+def merton_put(S, K, T, r, sigma, intensity, jump_mean, jump_std, n_terms=60):
+    """
+    Merton (1976) jump-diffusion European put as a Poisson-weighted series of Black-Scholes puts.
+
+    Term n is the Black-Scholes put given exactly n jumps, with the rate and variance adjusted
+    for them; the terms are evaluated together as one array. Accepts arrays for S and K.
+
+    Args:
+        S, K, T, r, sigma: As for Black-Scholes.
+        intensity, jump_mean, jump_std: Jump rate per year and the normal law of the log jump size.
+        n_terms: Number of series terms (the Poisson tail beyond it is dropped).
+    Returns:
+        Put price(s) with the broadcast shape of S and K.
+    """
+    S, K = np.broadcast_arrays(np.asarray(S, dtype=float), np.asarray(K, dtype=float))
+    mean_jump = np.exp(jump_mean + 0.5 * jump_std ** 2) - 1
+    weighted_intensity = intensity * (1 + mean_jump) * T
+    n = np.arange(n_terms).reshape((-1,) + (1,) * S.ndim)
+
+    rate_n = r - intensity * mean_jump + n * np.log(1 + mean_jump) / T
+    sigma_n = np.sqrt(sigma ** 2 + n * jump_std ** 2 / T)
+    terms = black_scholes_put(S, K, T, rate_n, sigma_n)
+    return np.sum(poisson.pmf(n, weighted_intensity) * terms, axis=0)
+
+
+def _with_steps(parameters, steps, years):
+    """parameters with the same horizon in years on a grid of steps per year."""
+    grid = copy.copy(parameters)
+    grid.time_step = steps
+    grid.time_horizon = grid.time_horizon_step = max(1, round(years * steps))
+    return grid
+
+
+def benchmark_path_models(parameters, models, n_paths=20_000, steps_per_year=(12, 52, 252), strike=None,
+                          repeat=3, seed=0, reference_steps_per_year=None):
+    """
+    Paths per second and scheme error of path models at several time-step sizes.
+
+    The horizon in years stays that of parameters; time_step and time_horizon_step are set to
+    each steps_per_year. The error is the Monte Carlo E[max(K - S_T, 0)] minus a reference:
+    the model's terminal_put_mean where it has one (so for the exact GBM the error is pure
+    sampling noise), otherwise the same model simulated with reference_steps_per_year steps
+    and independent paths, a step-refinement convergence check (e.g. for LocalVolModel). The
+    standard error then includes the reference's own noise.
+
+    Args:
+        parameters: Parameters instance (see main.py).
+        models: dict of name -> model object.
+        n_paths: Paths per run.
+        steps_per_year: Time steps per year to test.
+        strike: Put strike of the error check; defaults to strike_price_PUT.
+        repeat: Timing repeats (the best is kept).
+        seed: Seed of the paths.
+        reference_steps_per_year: Steps per year of the refined reference run; defaults to four
+            times the finest of steps_per_year.
+    Returns:
+        List of dicts with model, steps_per_year, paths_per_sec, put_mean, error, std_error and
+        reference ("closed form" or the reference steps per year).
+    """
+    strike = parameters.strike_price_PUT if strike is None else strike
+    years = parameters.time_horizon_step / parameters.time_step
+    reference_steps_per_year = reference_steps_per_year or 4 * max(steps_per_year)
+
+    references = {}
+    for name, model in models.items():
+        if hasattr(model, "terminal_put_mean"):
+            references[name] = (None, 0.0, "closed form")
+        else:
+            paths = model.simulate(_with_steps(parameters, reference_steps_per_year, years), n_paths,
+                                   rng=np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0]))
+            payoff = np.maximum(strike - paths[:, -1], 0)
+            references[name] = (payoff.mean(), payoff.std(ddof=1) / np.sqrt(n_paths), reference_steps_per_year)
+
+    rows = []
+    for steps in steps_per_year:
+        grid = _with_steps(parameters, steps, years)
+        for name, model in models.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                paths = model.simulate(grid, n_paths, rng=np.random.default_rng(seed))
+                timings.append(time.perf_counter() - start)
+            payoff = np.maximum(strike - paths[:, -1], 0)
+            std_error = payoff.std(ddof=1) / np.sqrt(n_paths)
+            reference, reference_error, label = references[name]
+            if reference is None:
+                reference = model.terminal_put_mean(grid, strike)
+            rows.append({"model": name, "steps_per_year": steps, "paths_per_sec": n_paths / min(timings),
+                         "put_mean": payoff.mean(), "error": payoff.mean() - reference,
+                         "std_error": np.sqrt(std_error ** 2 + reference_error ** 2), "reference": label})
+    return rows
@@ -0,0 +1,156 @@
+import numpy as np
+from dataclasses import dataclass
+from scipy.special import ndtr
+
+
+''' Array kernels for the protective put roll simulated by OptionSimulator in main.py.
+
+    Everything here works on whole price paths at once (the last axis is the day), so a
+    simulation is a handful of numpy calls instead of a Python loop with a scalar
+    Black-Scholes evaluation per day. The module only needs numpy and scipy, so it can be
+    imported without the data/plotting stack main.py pulls in.
+'''
+
+
+def black_scholes_put(equity_price, put_strike, time_to_expiration, risk_free_rate, volatility):
+    """
+    Black-Scholes put price, elementwise over arrays.
+
+    Where time_to_expiration <= 0 the put is worth its intrinsic value.
+    """
+    equity_price, put_strike, time_to_expiration = np.broadcast_arrays(
+        np.asarray(equity_price, dtype=float), np.asarray(put_strike, dtype=float),
+        np.asarray(time_to_expiration, dtype=float))
+    live = time_to_expiration > 0
+    T = np.where(live, time_to_expiration, 1.0)
+
+    sigma_sqrt_T = volatility * np.sqrt(T)
+    d1 = (np.log(equity_price / put_strike) + (risk_free_rate + 0.5 * volatility ** 2) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    put_price = put_strike * np.exp(-risk_free_rate * T) * ndtr(-d2) - equity_price * ndtr(-d1)
+    return np.where(live, put_price, np.maximum(put_strike - equity_price, 0))
+
+
+def first_crossing(prices, level):
+    """Index along the last axis of the first price >= level, or the number of days if it never gets there."""
+    hit = prices >= level
+    return np.where(hit.any(axis=-1), hit.argmax(axis=-1), prices.shape[-1])
+
+
+def roll_put_strategy(prices, parameters):
+    """
+    Value the long stock + protective put position over whole price paths.
+
+    The position starts long num_shares on margin with num_puts puts struck at
+    strike_price_PUT. The first day the stock trades at or above trigger_price
+    those puts are sold and replaced by puts struck at trigger_price_PUT, and
+    held to the end. Every day the puts are marked with Black-Scholes at the
+    remaining time (time_horizon - day) / time_step, and margin interest on the
+    borrowed amount accrues daily.
+
+    Args:
+        prices: Stock prices, shape (..., days); leading axes are independent paths.
+        parameters: Parameters instance (see main.py).
+    Returns:
+        dict with, per day, "put_strike", "put_value" (for all puts held),
+        "margin_interest" (cumulative), "position_value" and "triggered" (the
+        roll happened that day), all shaped like prices, and "trigger_day",
+        shape prices.shape[:-1] (the number of days where there was no roll).
+    """
+    prices = np.asarray(prices, dtype=float)
+    days = np.arange(prices.shape[-1])
+    dt = 1 / parameters.time_step
+
+    trigger_day = first_crossing(prices, parameters.trigger_price)
+    rolled = days >= trigger_day[..., None]
+    put_strike = np.where(rolled, parameters.trigger_price_PUT, parameters.strike_price_PUT)
+
+    # The roll fires on the crossing day; if the new strike equals the old one, it keeps firing
+    # on every later day at or above the trigger, as there is nothing to tell the two puts apart.
+    triggered = days == trigger_day[..., None]
+    if parameters.trigger_price_PUT == parameters.strike_price_PUT:
+        triggered |= rolled & (prices >= parameters.trigger_price)
+
+    time_to_expiration = (parameters.time_horizon - days) * dt
+    put_value = parameters.num_puts * 100 * black_scholes_put(
+        prices, put_strike, time_to_expiration, parameters.risk_free_rate, parameters.volatility)
+
+    borrowed_amount = parameters.num_shares * parameters.initial_equity_price * (1 - parameters.margin_requirement)
+    daily_interest = borrowed_amount * parameters.margin_rate / parameters.time_step
+    margin_interest = np.broadcast_to(daily_interest * (days + 1), prices.shape)
+
+    position_value = parameters.num_shares * prices + put_value - margin_interest
+    return {
+        "put_strike": put_strike,
+        "put_value": put_value,
+        "margin_interest": margin_interest,
+        "position_value": position_value,
+        "triggered": triggered,
+        "trigger_day": trigger_day,
+    }
+
+
+@dataclass
+class StrategyDistribution:
+    final_value: np.ndarray
+    roll_day: np.ndarray
+    margin_interest: np.ndarray
+    max_drawdown: np.ndarray
+    days: int
+
+    @property
+    def rolled(self):
+        """Mask of the paths on which the puts were rolled."""
+        return self.roll_day < self.days
+
+    def summary(self, percentiles=(5, 25, 50, 75, 95)):
+        """
+        Summary statistics per quantity.
+
+        Returns:
+            dict mapping "final_value", "roll_day" (over rolled paths only), "margin_interest"
+            and "max_drawdown" to dicts of mean, std and the given percentiles, plus
+            "roll_probability".
+        """
+        stats = {}
+        for name, values in (("final_value", self.final_value), ("roll_day", self.roll_day[self.rolled]),
+                             ("margin_interest", self.margin_interest), ("max_drawdown", self.max_drawdown)):
+            if values.size == 0:
+                stats[name] = None
+                continue
+            stats[name] = {"mean": values.mean(), "std": values.std(ddof=1) if values.size > 1 else 0.0,
+                           **{f"p{q}": value for q, value in zip(percentiles, np.percentile(values, percentiles))}}
+        stats["roll_probability"] = self.rolled.mean()
+        return stats
+
+
+def evaluate_put_roll(paths, parameters, chunk_size=4096):
+    """
+    Apply the put roll of roll_put_strategy to many paths and keep only per-path results.
+
+    Paths are processed chunk_size rows at a time, so the per-day intermediates stay small
+    and the memory needed is that of the paths plus a few values per path.
+
+    Args:
+        paths: (paths x days) price array, or an iterable of such chunks (e.g.
+            monte_carlo.iter_gbm_paths), in which case the paths are never all in memory.
+        parameters: Parameters instance (see main.py).
+        chunk_size: Rows valued at a time.
+    Returns:
+        StrategyDistribution with, per path, the final Total Position Value, the roll day
+        (the number of days where there was no roll), the final cumulative margin interest
+        and the maximum drawdown of the position value as a fraction of its running peak.
+    """
+    chunks = [paths] if isinstance(paths, np.ndarray) else paths
+    results, days = [], None
+    for chunk in chunks:
+        for start in range(0, len(chunk), chunk_size):
+            strategy = roll_put_strategy(chunk[start:start + chunk_size], parameters)
+            position_value = strategy["position_value"]
+            peak = np.maximum.accumulate(position_value, axis=-1)
+            results.append((position_value[:, -1], strategy["trigger_day"], strategy["margin_interest"][:, -1],
+                            np.max(1 - position_value / peak, axis=-1)))
+            days = position_value.shape[-1]
+
+    final_value, roll_day, margin_interest, max_drawdown = (np.concatenate(column) for column in zip(*results))
+    return StrategyDistribution(final_value, roll_day, margin_interest, max_drawdown, days)
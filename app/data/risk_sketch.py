@@ -0,0 +1,147 @@
+import numpy as np
+from scipy.special import ndtri
+
+
+''' Streaming Value at Risk and Expected Shortfall over simulated values.
+
+    Values arrive chunk by chunk (e.g. the final Total Position Value of each chunk from
+    OptionSimulator.iter_stock_paths) and are folded into a merging t-digest: a sorted list of
+    centroids (weight, sum, sum of squares) whose sizes follow the k1 scale function, so
+    clusters are large in the middle of the distribution and nearly single values in the
+    tails, where VaR and ES are read. Memory is bounded by the compression, whatever the
+    number of paths; each chunk is merged with one sort and a few bincounts, with no
+    per-value Python loop.
+
+    Losses are reference - value, so VaR and ES at level 0.99 describe the worst 1% of outcomes
+    as positive numbers.
+'''
+
+
+class TDigest:
+    """
+    Merging t-digest of a stream of numbers.
+
+    Args:
+        compression: Scale of the digest; it holds at most about compression / 2 centroids,
+            and the extreme centroids cover about (pi / compression) ** 2 of the mass each.
+    """
+
+    def __init__(self, compression=1000):
+        self.compression = compression
+        self.weights = np.empty(0)
+        self.sums = np.empty(0)
+        self.squares = np.empty(0)
+        self.min, self.max = np.inf, -np.inf
+
+    @property
+    def count(self):
+        return self.weights.sum()
+
+    @property
+    def means(self):
+        return self.sums / self.weights
+
+    def update(self, values):
+        """Add an array of values."""
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+        self._merge(np.ones_like(values), values, values ** 2)
+
+    def merge(self, other):
+        """Fold another digest (e.g. from another worker) into this one."""
+        if other.weights.size:
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self._merge(other.weights, other.sums, other.squares)
+
+    def _merge(self, weights, sums, squares):
+        weights = np.concatenate([self.weights, weights])
+        sums = np.concatenate([self.sums, sums])
+        squares = np.concatenate([self.squares, squares])
+        order = np.argsort(sums / weights, kind="stable")
+        weights, sums, squares = weights[order], sums[order], squares[order]
+
+        # Neighbours whose mid-rank falls in the same unit interval of k1(q) = c / (2 pi) asin(2q - 1)
+        # become one centroid
+        cumulative = np.cumsum(weights)
+        q = (cumulative - 0.5 * weights) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        cluster = np.concatenate([[0], np.cumsum(np.diff(cluster) != 0)])
+
+        self.weights = np.bincount(cluster, weights)
+        self.sums = np.bincount(cluster, sums)
+        self.squares = np.bincount(cluster, squares)
+
+    def quantile(self, q):
+        """Quantile(s) at q, interpolated between centroid mid-ranks (and the exact min and max); NaN if empty."""
+        if self.weights.size == 0:
+            return np.full(np.shape(q), np.nan)
+        cumulative = np.cumsum(self.weights)
+        ranks = np.concatenate([[0.0], cumulative - 0.5 * self.weights, [cumulative[-1]]])
+        levels = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q, dtype=float) * cumulative[-1], ranks, levels)
+
+    def upper_tail(self, q):
+        """Mean and variance of the values above the q quantile (the top (1 - q) of the mass); NaN if empty."""
+        if self.weights.size == 0:
+            return np.nan, np.nan
+        cumulative = np.cumsum(self.weights)
+        # Weight each centroid contributes above rank q * count (part of the straddling one)
+        take = np.clip(cumulative - q * cumulative[-1], 0, self.weights)
+        mass = take.sum()
+        mean = take @ self.means / mass
+        second = take @ (self.squares / self.weights) / mass
+        return mean, max(second - mean ** 2, 0.0)
+
+
+class StreamingRisk:
+    """
+    Running VaR and ES of the losses reference - value at several confidence levels.
+
+    Args:
+        levels: Confidence levels, e.g. (0.95, 0.99).
+        reference: Value losses are measured from (e.g. the initial position value).
+        compression: t-digest compression (see TDigest).
+    """
+
+    def __init__(self, levels=(0.95, 0.99), reference=0.0, compression=1000):
+        self.levels = tuple(levels)
+        self.reference = reference
+        self.digest = TDigest(compression)
+
+    def update(self, values):
+        """Add a chunk of simulated values."""
+        self.digest.update(self.reference - np.asarray(values, dtype=float))
+
+    def report(self, confidence=0.95):
+        """
+        VaR and ES at every level with confidence intervals.
+
+        The VaR interval is the distribution-free one between the order statistics at ranks
+        n * level -+ z sqrt(n * level * (1 - level)); the ES standard error is the asymptotic
+        sqrt((Var(L | L >= VaR) + level * (ES - VaR) ** 2) / (n * (1 - level))).
+
+        Returns:
+            list of dicts with level, var, var_low, var_high, es, es_std_error, es_low, es_high
+            and n_paths; before any update, every estimate is NaN and n_paths is 0.
+        """
+        n = self.digest.count
+        z = ndtri(0.5 + 0.5 * confidence)
+        rows = []
+        for level in self.levels:
+            if n == 0:
+                rows.append({"level": level, **dict.fromkeys(("var", "var_low", "var_high", "es", "es_std_error",
+                                                              "es_low", "es_high"), np.nan), "n_paths": 0})
+                continue
+            half_width = z * np.sqrt(level * (1 - level) / n)
+            var_low, var, var_high = self.digest.quantile([max(level - half_width, 0), level,
+                                                           min(level + half_width, 1)])
+            es, tail_variance = self.digest.upper_tail(level)
+            es_std_error = np.sqrt((tail_variance + level * (es - var) ** 2) / (n * (1 - level)))
+            rows.append({"level": level, "var": float(var), "var_low": float(var_low), "var_high": float(var_high),
+                         "es": float(es), "es_std_error": float(es_std_error),
+                         "es_low": float(es - z * es_std_error), "es_high": float(es + z * es_std_error),
+                         "n_paths": int(n)})
+        return rows
@@ -0,0 +1,162 @@
+import os
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+from put_strategy import black_scholes_put
+
+
+''' Result of one OptionSimulator run and the optional outputs ("sinks") that consume it.
+
+    OptionSimulator.run only computes: it returns a SimulationResult and does no printing,
+    plotting or file output of its own. Each of those is a sink, a callable sink(result) passed
+    in run(sinks=[...]), so batch jobs pay only for the outputs they ask for.
+    INTERACTIVE_SINKS reproduces what the simulator used to do on construction.
+
+    matplotlib and prettytable are imported inside the sinks that need them, so code that uses
+    this module without main.py (which imports both at the top) does not load them headless.
+'''
+
+
+@dataclass
+class SimulationResult:
+    prices: np.ndarray
+    strategy: dict
+    frame: pd.DataFrame
+    parameters: object
+
+    @property
+    def trigger_days(self):
+        """Days on which the puts were rolled."""
+        return np.flatnonzero(self.strategy["triggered"])
+
+    @property
+    def final_value(self):
+        """Total Position Value on the last day."""
+        return float(self.strategy["position_value"][-1])
+
+
+def build_result(prices, strategy, parameters, start_date='2023-01-01'):
+    """
+    Assemble the per-day table of a simulated path and its put roll.
+
+    Args:
+        prices: Simulated stock prices, one per day.
+        strategy: put_strategy.roll_put_strategy of those prices.
+        parameters: Parameters instance (see main.py).
+        start_date: First business day of the table.
+    Returns:
+        SimulationResult whose frame has Date, Stock Price, Put Strike Price, Put Option Value,
+        Margin Interest, Total Position Value, Action and Value columns.
+    """
+    dates = pd.date_range(start=start_date, periods=len(prices), freq='B')
+    actions = np.full(len(prices), '[!] No need for action today', dtype=object)
+    for day in np.flatnonzero(strategy["triggered"]):
+        actions[day] = (
+            f' [+] DAY: {day} Bought puts at K=${parameters.trigger_price_PUT} for ${strategy["put_value"][day]:.2f}, '
+            f'[PRICE ACTION] Sold puts at ${parameters.strike_price_PUT}, bought puts at ${parameters.trigger_price_PUT}')
+
+    frame = pd.DataFrame({
+        'Date': dates.date,
+        'Stock Price': prices,
+        'Put Strike Price': strategy["put_strike"],
+        'Put Option Value': strategy["put_value"],
+        'Margin Interest': strategy["margin_interest"],
+        'Total Position Value': strategy["position_value"],
+        'Action': actions,
+    })
+    frame['Value'] = frame['Total Position Value'].map('${:,.2f}'.format)
+    return SimulationResult(prices, strategy, frame, parameters)
+
+
+def print_trigger_log(result):
+    """Print the roll actions, one block per trigger day: the puts sold, with their proceeds, and bought."""
+    parameters = result.parameters
+    days = result.trigger_days
+    time_to_expiration = (parameters.time_horizon - days) / parameters.time_step
+    proceeds = parameters.num_puts * 100 * black_scholes_put(result.prices[days], parameters.strike_price_PUT,
+                                                             time_to_expiration, parameters.risk_free_rate,
+                                                             parameters.volatility)
+    for day, sold_for in zip(days, proceeds):
+        print("\n[!] Trigger price reached. Adjusting put options...")
+        print(f"\n[+] Sold puts at ${parameters.strike_price_PUT} for ${sold_for:.2f}")
+        print(f"\n[RESULTS] \n[+] Day {day} Bought puts at ${parameters.trigger_price_PUT} "
+              f"for ${result.strategy['put_value'][day]:.2f}")
+        print("[+] Price Action: ", result.frame['Action'].iat[day])
+
+
+def csv_sink(directory="BLACK_SCHOLES_RESULTS"):
+    """Sink writing simulated_stock_prices.csv and simulation_results.csv to directory."""
+    def sink(result):
+        os.makedirs(directory, exist_ok=True)
+        prices_file = os.path.join(directory, "simulated_stock_prices.csv")
+        result.frame[['Date', 'Stock Price']].to_csv(prices_file, index=False)
+        results_file = os.path.join(directory, "simulation_results.csv")
+        result.frame.to_csv(results_file, index=False)
+        print(f"[!] Data saved to {prices_file} and {results_file}")
+    return sink
+
+
+def excel_sink(directory="BLACK_SCHOLES_RESULTS"):
+    """Sink writing simulation_results.xlsx to directory (needs openpyxl)."""
+    def sink(result):
+        os.makedirs(directory, exist_ok=True)
+        excel_file = os.path.join(directory, "simulation_results.xlsx")
+        try:
+            result.frame.to_excel(excel_file, index=False, engine='openpyxl')
+            print(f"[!] Data saved to {excel_file}")
+        except Exception as e:
+            print(f"[-] Error saving data: {e}")
+    return sink
+
+
+def print_table(result):
+    """Print the per-day table as a PrettyTable."""
+    from prettytable import PrettyTable
+
+    table = PrettyTable()
+    table.field_names = result.frame.columns.tolist()
+    for row in result.frame.itertuples(index=False):
+        table.add_row(row)
+    print(table)
+
+
+def plot_sink(show=True, directory="."):
+    """
+    Sink plotting the simulated prices, the Total Position Value, and the stock price against
+    the put strike; each figure is saved as a PNG in directory and shown if show is True.
+    """
+    def sink(result):
+        import matplotlib.pyplot as plt
+
+        frame, horizon = result.frame, result.parameters.time_horizon
+        figures = (
+            ('simulated_stock_prices.png', f'Simulated Stock Prices over {horizon} Days',
+             'Price ($)', [('Stock Price', {})]),
+            ('total_position_value.png', f"Investor's Total Position Value Over {horizon} Days",
+             'Value ($)', [('Total Position Value', {})]),
+            ('stock_and_put_strike_price.png', f'Stock Price and Put Strike Price Over {horizon} Days',
+             'Price ($)', [('Stock Price', {}), ('Put Strike Price', {'linestyle': '--'})]),
+        )
+        for file_name, title, ylabel, series in figures:
+            plt.figure(figsize=(12, 6))
+            for column, style in series:
+                plt.plot(frame['Date'], frame[column], label=column, **style)
+            plt.title(title)
+            plt.xlabel('Date')
+            plt.ylabel(ylabel)
+            plt.legend()
+            plt.grid(True)
+            plt.tight_layout()
+
+            output_file = os.path.join(directory, file_name)
+            plt.savefig(output_file, dpi=300, bbox_inches='tight')
+            print(f'[!] Graph saved to {output_file}')
+            if show:
+                plt.show()
+            else:
+                plt.close()
+    return sink
+
+
+INTERACTIVE_SINKS = (csv_sink(), print_trigger_log, excel_sink(), print_table, plot_sink())
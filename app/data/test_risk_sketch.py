@@ -0,0 +1,30 @@
+import numpy as np
+
+from risk_sketch import StreamingRisk, TDigest
+
+
+def test_empty_digest_is_nan():
+    digest = TDigest()
+    assert np.isnan(digest.quantile(0.5))
+    assert np.all(np.isnan(digest.quantile([0.1, 0.9])))
+    assert all(np.isnan(digest.upper_tail(0.99)))
+
+
+def test_report_before_update():
+    rows = StreamingRisk(levels=(0.95, 0.99), reference=100.0).report()
+    assert [row["level"] for row in rows] == [0.95, 0.99]
+    for row in rows:
+        assert row["n_paths"] == 0
+        assert all(np.isnan(row[name]) for name in ("var", "var_low", "var_high", "es", "es_std_error",
+                                                    "es_low", "es_high"))
+
+
+def test_report_matches_normal_tail():
+    risk = StreamingRisk(levels=(0.99,))
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        risk.update(rng.standard_normal(100_000))
+    row, = risk.report()
+    assert row["n_paths"] == 1_000_000
+    assert abs(row["var"] - 2.3263) < 0.02
+    assert abs(row["es"] - 2.6652) < 0.02
@@ -1,10 +1,14 @@
 # src/derivatives/core/options_calculator.py
 import numpy as np
+from scipy.special import ndtr
 from scipy.stats import norm
 
 class OptionsCalculator:
 def __init__(self, risk_free_rate=0.02):
 self.risk_free_rate = risk_free_rate
+self._quote_contracts = None
+self._quote_table = None
+self._quote_rate = None
 
 def black_scholes(self, S, K, T, sigma, option_type='call'):
 """Calculate option price using Black-Scholes model
@@ -43,4 +47,132 @@ return norm.pdf(d1) / (S * sigma * np.sqrt(T))
 def calculate_vega(self, S, K, T, sigma):
 """Calculate Vega (ν): sensitivity to volatility changes"""
 d1 = (np.log(S/K) + (self.risk_free_rate + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-return S * np.sqrt(T) * norm.pdf(d1) / 100  # Scaled by 100 for 1% change
\ No newline at end of file
+return S * np.sqrt(T) * norm.pdf(d1) / 100  # Scaled by 100 for 1% change
+
+def calculate_greeks(self, S, K, T, sigma, option_type='call'):
+"""Price and all Greeks for arrays of options in one pass
+
+d1, d2, the normal pdf and the two normal cdfs are each evaluated once
+and shared. scipy.special.ndtr is used instead of norm.cdf, which
+avoids the argument checking of scipy.stats on every call.
+
+Args:
+    S: Current stock price(s)
+K: Strike price(s)
+T: Time(s) to expiration (in years)
+sigma: Volatility(ies)
+option_type: 'call'/'put', or an array of them
+
+Returns:
+    dict of price, delta, gamma, vega (per 1% vol), theta (per calendar day)
+and rho (per 1% rate), each broadcast to the shape of the inputs
+"""
+S, K, T, sigma = (np.asarray(x, dtype=float) for x in (S, K, T, sigma))
+phi = np.where(np.asarray(option_type) == 'call', 1.0, -1.0)
+sqrt_T = np.sqrt(T)
+sigma_sqrt_T = sigma * sqrt_T
+d1 = (np.log(S/K) + (self.risk_free_rate + 0.5 * sigma**2) * T) / sigma_sqrt_T
+d2 = d1 - sigma_sqrt_T
+
+pdf_d1 = np.exp(-0.5 * d1**2) / np.sqrt(2 * np.pi)
+cdf_d1 = ndtr(phi * d1)
+discounted_K = K * np.exp(-self.risk_free_rate * T)
+discounted_cdf_d2 = discounted_K * ndtr(phi * d2)
+
+return {
+'price': phi * (S * cdf_d1 - discounted_cdf_d2),
+'delta': phi * cdf_d1,
+'gamma': pdf_d1 / (S * sigma_sqrt_T),
+'vega': S * sqrt_T * pdf_d1 / 100,
+'theta': (-S * pdf_d1 * sigma / (2 * sqrt_T) - phi * self.risk_free_rate * discounted_cdf_d2) / 365,
+'rho': phi * T * discounted_cdf_d2 / 100,
+}
+
+def prepare_quotes(self, K, T, sigma, option_type='call', dtype=np.float64):
+"""Fix the contracts of a quote loop so each tick only does the spot-dependent work
+
+This is a per-contract table of exact Black-Scholes terms, not an
+interpolation grid over (moneyness, total variance): in numpy a bicubic
+lookup costs more than evaluating ndtr and exp directly.
+
+Everything in calculate_greeks that does not depend on S (log strike,
+sigma * sqrt(T), the discounted strike, the drift term of d1, ...) is
+tabulated once per contract by quote_greeks, on first use and again
+whenever risk_free_rate has changed since. For 100k contracts a tick
+then takes about two thirds of the time of calculate_greeks.
+
+Args:
+    K: Strike price(s)
+T: Time(s) to expiration (in years)
+sigma: Volatility(ies)
+option_type: 'call'/'put', or an array of them
+dtype: np.float64 reproduces calculate_greeks to rounding; np.float32
+halves the table at the cost of float32 rounding, mostly in d1
+(about 6e-8 * |log(S)| / (sigma * sqrt(T)) absolute), so it grows
+for short expiries and low vols. Measured maxima (not a bound) over
+20 x 100k random contracts with T in [0.01, 2], sigma in [0.1, 0.6]:
+price 2.4e-7 * S for K/S in [0.5, 1.5] and 5.8e-7 * S for K/S in
+[0.25, 4]; delta 1e-5, gamma 7e-6, vega, theta and rho 4e-6. Use
+np.float64 where errors of that size matter.
+"""
+K, T, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (K, T, sigma)))
+phi = np.broadcast_to(np.where(np.asarray(option_type) == 'call', 1.0, -1.0), K.shape)
+self._quote_contracts = (K, T, sigma, phi, dtype)
+self._quote_rate = None
+
+def _build_quote_table(self):
+"""Tabulate the spot-independent terms of the prepared contracts at the current rate"""
+K, T, sigma, phi, dtype = self._quote_contracts
+r = self.risk_free_rate
+sqrt_T = np.sqrt(T)
+sigma_sqrt_T = sigma * sqrt_T
+# d1 = log(S) / (sigma sqrt(T)) + d1_shift
+columns = {
+'inverse_sigma_sqrt_T': 1 / sigma_sqrt_T,
+'d1_shift': ((r + 0.5 * sigma**2) * T - np.log(K)) / sigma_sqrt_T,
+'sigma_sqrt_T': sigma_sqrt_T,
+'phi': phi,
+'discounted_K': K * np.exp(-r * T),
+'sqrt_T': sqrt_T,
+'theta_scale': sigma / (2 * sqrt_T),
+'T': T,
+}
+self._quote_table = {name: np.ascontiguousarray(column, dtype=dtype) for name, column in columns.items()}
+self._quote_rate = r
+
+def quote_greeks(self, S):
+"""Price and all Greeks of the contracts given to prepare_quotes at spot(s) S
+
+Same results and keys as calculate_greeks, at the precision of the
+prepare_quotes dtype. The table is rebuilt lazily if risk_free_rate
+has changed since it was built.
+
+Args:
+    S: Current stock price, or one per contract
+
+Returns:
+    dict of price, delta, gamma, vega (per 1% vol), theta (per calendar day)
+and rho (per 1% rate)
+"""
+if self._quote_contracts is None:
+raise ValueError("call prepare_quotes before quote_greeks")
+if self._quote_rate != self.risk_free_rate:
+self._build_quote_table()
+table = self._quote_table
+S = np.asarray(S, dtype=table['phi'].dtype)
+phi = table['phi']
+d1 = np.log(S) * table['inverse_sigma_sqrt_T'] + table['d1_shift']
+d2 = d1 - table['sigma_sqrt_T']
+
+pdf_d1 = np.exp(-0.5 * d1 * d1) * (1 / np.sqrt(2 * np.pi))
+cdf_d1 = ndtr(phi * d1)
+discounted_cdf_d2 = table['discounted_K'] * ndtr(phi * d2)
+
+return {
+'price': phi * (S * cdf_d1 - discounted_cdf_d2),
+'delta': phi * cdf_d1,
+'gamma': pdf_d1 * table['inverse_sigma_sqrt_T'] / S,
+'vega': S * table['sqrt_T'] * pdf_d1 / 100,
+'theta': (-S * pdf_d1 * table['theta_scale'] - phi * self.risk_free_rate * discounted_cdf_d2) / 365,
+'rho': phi * table['T'] * discounted_cdf_d2 / 100,
+}